@@ -1,66 +1,119 @@
-from pgmpy.models import DiscreteBayesianNetwork
-from pgmpy.inference import VariableElimination
-
-alarm_model = DiscreteBayesianNetwork(
-    [
-        ("Burglary", "Alarm"),
-        ("Earthquake", "Alarm"),
-        ("Alarm", "JohnCalls"),
-        ("Alarm", "MaryCalls"),
-    ]
-)
-
-# Defining the parameters using CPT
-from pgmpy.factors.discrete import TabularCPD
-
-cpd_burglary = TabularCPD(
-    variable="Burglary", variable_card=2, values=[[0.999], [0.001]],
-    state_names={"Burglary":['no','yes']},
-)
-cpd_earthquake = TabularCPD(
-    variable="Earthquake", variable_card=2, values=[[0.998], [0.002]],
-    state_names={"Earthquake":["no","yes"]},
-)
-cpd_alarm = TabularCPD(
-    variable="Alarm",
-    variable_card=2,
-    values=[[0.999, 0.71, 0.06, 0.05], [0.001, 0.29, 0.94, 0.95]],
-    evidence=["Burglary", "Earthquake"],
-    evidence_card=[2, 2],
-    state_names={"Burglary":['no','yes'], "Earthquake":['no','yes'], 'Alarm':['yes','no']},
-)
-cpd_johncalls = TabularCPD(
-    variable="JohnCalls",
-    variable_card=2,
-    values=[[0.95, 0.1], [0.05, 0.9]],
-    evidence=["Alarm"],
-    evidence_card=[2],
-    state_names={"Alarm":['yes','no'], "JohnCalls":['yes', 'no']},
-)
-cpd_marycalls = TabularCPD(
-    variable="MaryCalls",
-    variable_card=2,
-    values=[[0.1, 0.7], [0.9, 0.3]],
-    evidence=["Alarm"],
-    evidence_card=[2],
-state_names={"Alarm":['yes','no'], "MaryCalls":['yes', 'no']},
-)
-
-# Associating the parameters with the model structure
-alarm_model.add_cpds(
-    cpd_burglary, cpd_earthquake, cpd_alarm, cpd_johncalls, cpd_marycalls)
-
-alarm_infer = VariableElimination(alarm_model)
-
-#print(alarm_infer.query(variables=["JohnCalls"],evidence={"Earthquake":"yes"}))
-#
-#the probability of Mary Calling given that John called
-
-q = alarm_infer.query(variables=["Alarm", "Burglary"],evidence={"MaryCalls":"yes"})
-print(q)
+import importlib
+from functools import lru_cache
+
+# Importing this module is cheap: pgmpy is only loaded, and the network
+# only built, when get_alarm_network() or get_alarm_infer() first runs.
+
+@lru_cache(maxsize=None)
+def get_alarm_network():
+    """Build the alarm network once per process."""
+    from pgmpy.models import DiscreteBayesianNetwork
+    from pgmpy.factors.discrete import TabularCPD
+
+    alarm_model = DiscreteBayesianNetwork(
+        [
+            ("Burglary", "Alarm"),
+            ("Earthquake", "Alarm"),
+            ("Alarm", "JohnCalls"),
+            ("Alarm", "MaryCalls"),
+        ]
+    )
+
+    # Defining the parameters using CPT
+
+    cpd_burglary = TabularCPD(
+        variable="Burglary", variable_card=2, values=[[0.999], [0.001]],
+        state_names={"Burglary":['no','yes']},
+    )
+    cpd_earthquake = TabularCPD(
+        variable="Earthquake", variable_card=2, values=[[0.998], [0.002]],
+        state_names={"Earthquake":["no","yes"]},
+    )
+    cpd_alarm = TabularCPD(
+        variable="Alarm",
+        variable_card=2,
+        values=[[0.999, 0.71, 0.06, 0.05], [0.001, 0.29, 0.94, 0.95]],
+        evidence=["Burglary", "Earthquake"],
+        evidence_card=[2, 2],
+        state_names={"Burglary":['no','yes'], "Earthquake":['no','yes'], 'Alarm':['yes','no']},
+    )
+    cpd_johncalls = TabularCPD(
+        variable="JohnCalls",
+        variable_card=2,
+        values=[[0.95, 0.1], [0.05, 0.9]],
+        evidence=["Alarm"],
+        evidence_card=[2],
+        state_names={"Alarm":['yes','no'], "JohnCalls":['yes', 'no']},
+    )
+    cpd_marycalls = TabularCPD(
+        variable="MaryCalls",
+        variable_card=2,
+        values=[[0.1, 0.7], [0.9, 0.3]],
+        evidence=["Alarm"],
+        evidence_card=[2],
+    state_names={"Alarm":['yes','no'], "MaryCalls":['yes', 'no']},
+    )
+
+    # Associating the parameters with the model structure
+    alarm_model.add_cpds(
+        cpd_burglary, cpd_earthquake, cpd_alarm, cpd_johncalls, cpd_marycalls)
+    return alarm_model
+
+
+@lru_cache(maxsize=None)
+def get_alarm_infer():
+    """Compile the alarm network for inference once per process."""
+    from compiled_inference import CompiledInference
+    return CompiledInference(get_alarm_network())
+
+
+# The CPDs used to be module globals; they are looked up on the built network
+_CPD_VARIABLES = {
+    "cpd_burglary": "Burglary",
+    "cpd_earthquake": "Earthquake",
+    "cpd_alarm": "Alarm",
+    "cpd_johncalls": "JohnCalls",
+    "cpd_marycalls": "MaryCalls",
+}
+
+# Names the module used to import at the top level
+_IMPORTED = {
+    "DiscreteBayesianNetwork": "pgmpy.models",
+    "TabularCPD": "pgmpy.factors.discrete",
+    "CompiledInference": "compiled_inference",
+}
+
+
+@lru_cache(maxsize=None)
+def _default_query():
+    return get_alarm_infer().query(variables=["Alarm", "Burglary"], evidence={"MaryCalls": "yes"})
+
+
+def __getattr__(name):
+    # The old module attributes stay importable, built on first access
+    if name == 'alarm_model':
+        return get_alarm_network()
+    if name == 'alarm_infer':
+        return get_alarm_infer()
+    if name in _CPD_VARIABLES:
+        return get_alarm_network().get_cpds(_CPD_VARIABLES[name])
+    if name == 'q':
+        return _default_query()
+    if name in _IMPORTED:
+        return getattr(importlib.import_module(_IMPORTED[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def main():
+    alarm_infer = get_alarm_infer()
+
+    #print(alarm_infer.query(variables=["JohnCalls"],evidence={"Earthquake":"yes"}))
+    #
+    #the probability of Mary Calling given that John called
+
+    q = alarm_infer.query(variables=["Alarm", "Burglary"],evidence={"MaryCalls":"yes"})
+    print(q)
+
     print("=== Alarm Network Queries ===")
 
     # Original Query: John calls given Earthquake
@@ -0,0 +1,279 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+from pgmpy.factors.discrete import DiscreteFactor
+
+
+class Estimate:
+    """Approximate posterior over variables with per-state standard errors.
+
+    values and stderr have one axis per variable, states in the order of
+    states[variable]. effective_samples is the Kish effective sample size
+    for likelihood weighting and the number of recorded chain states for
+    Gibbs sampling.
+    """
+
+    def __init__(self, variables, states, values, stderr, samples, effective_samples, seconds):
+        self.variables = list(variables)
+        self.states = states
+        self.values = values
+        self.stderr = stderr
+        self.samples = samples
+        self.effective_samples = effective_samples
+        self.seconds = seconds
+
+    def to_factor(self):
+        """Return the point estimate as a pgmpy DiscreteFactor."""
+        return DiscreteFactor(self.variables, list(self.values.shape), self.values,
+                              state_names={v: self.states[v] for v in self.variables})
+
+    def __str__(self):
+        lines = []
+        for index in np.ndindex(*self.values.shape):
+            label = ', '.join(f"{v}({self.states[v][k]})" for v, k in zip(self.variables, index))
+            lines.append(f"{label}: {self.values[index]:.4f} +/- {1.96 * self.stderr[index]:.4f}")
+        lines.append(f"({self.samples} samples, {self.effective_samples:.0f} effective, "
+                     f"{self.seconds:.3f}s)")
+        return '\n'.join(lines)
+
+
+class ApproximateInference:
+    """Sampling-based inference over the TabularCPDs of a DiscreteBayesianNetwork.
+
+    Every CPD is compiled once into a (parent configurations, states)
+    table, and samples are drawn a whole batch at a time, one numpy
+    operation per variable in topological order. Both samplers support a
+    sample budget, a time budget and a target standard error, checked
+    after every batch, and can split the work over a process pool.
+    """
+
+    def __init__(self, model):
+        order = list(nx.topological_sort(model))
+        cpds = {v: model.get_cpds(v) for v in order}
+        self.variables = order
+        self.index = {v: i for i, v in enumerate(order)}
+        self.states = {v: list(cpds[v].state_names[v]) for v in order}
+        self.state_index = {v: {s: i for i, s in enumerate(states)}
+                            for v, states in self.states.items()}
+        self.cardinality = [len(self.states[v]) for v in order]
+
+        self.parents = []
+        self.tables = []
+        for v in order:
+            cpd = cpds[v]
+            scope = list(cpd.variables)
+            values = cpd.values
+            # Align every axis with the state order used for sampling
+            for axis, u in enumerate(scope):
+                values = np.take(values, [cpd.state_names[u].index(s) for s in self.states[u]], axis=axis)
+            parents = scope[1:]
+            values = np.moveaxis(values, 0, -1).reshape(-1, len(self.states[v]))
+            self.parents.append([self.index[u] for u in parents])
+            self.tables.append(values)
+        self.cumulative = [np.cumsum(t, axis=1) for t in self.tables]
+
+        # Gibbs needs each variable's children to score its Markov blanket
+        self.children = [[] for _ in order]
+        for i, parents in enumerate(self.parents):
+            for p in parents:
+                self.children[p].append(i)
+
+    def _rows(self, samples, i):
+        """Row of variable i's table selected by each sample's parent states."""
+        parents = self.parents[i]
+        if not parents:
+            return np.zeros(len(samples), dtype=np.intp)
+        return np.ravel_multi_index(tuple(samples[:, p] for p in parents),
+                                    tuple(self.cardinality[p] for p in parents))
+
+    def _encode(self, variables, evidence):
+        common = set(variables) & set(evidence)
+        if common:
+            raise ValueError(f"Can't have the same variables in both `variables` and `evidence`. "
+                             f"Found in both: {common}")
+        clamped = {}
+        for v, state in evidence.items():
+            if state not in self.state_index[v]:
+                raise ValueError(f"{state!r} is not a state of {v}")
+            clamped[self.index[v]] = self.state_index[v][state]
+        return [self.index[v] for v in variables], clamped
+
+    def _joint_index(self, samples, targets):
+        return np.ravel_multi_index(tuple(samples[:, t] for t in targets),
+                                    tuple(self.cardinality[t] for t in targets))
+
+    def _forward_sample(self, rng, n, clamped):
+        """Ancestral samples with evidence clamped, and their likelihood weights."""
+        samples = np.empty((n, len(self.variables)), dtype=np.intp)
+        weights = np.ones(n)
+        for i in range(len(self.variables)):
+            rows = self._rows(samples, i)
+            state = clamped.get(i)
+            if state is None:
+                u = rng.random(n)[:, None]
+                samples[:, i] = np.minimum((u >= self.cumulative[i][rows]).sum(axis=1),
+                                           self.cardinality[i] - 1)
+            else:
+                samples[:, i] = state
+                weights *= self.tables[i][rows, state]
+        return samples, weights
+
+    def _likelihood_weighting(self, targets, clamped, batch_size, max_samples,
+                              time_budget, tolerance, seed):
+        """Accumulate weighted sums until a budget runs out; the sums merge across shards."""
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        rng = np.random.default_rng(seed)
+        size = int(np.prod([self.cardinality[t] for t in targets]))
+        sums = np.zeros(size)
+        squared_sums = np.zeros(size)
+        total = squared = 0.0
+        n = 0
+        while n < max_samples:
+            batch = min(batch_size, max_samples - n)
+            samples, weights = self._forward_sample(rng, batch, clamped)
+            joint = self._joint_index(samples, targets)
+            sums += np.bincount(joint, weights, size)
+            squared_sums += np.bincount(joint, weights * weights, size)
+            total += weights.sum()
+            squared += (weights * weights).sum()
+            n += batch
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if tolerance is not None and total > 0:
+                if _weighted_stderr(sums, squared_sums, total, squared).max() <= tolerance:
+                    break
+        return n, sums, squared_sums, total, squared
+
+    def _gibbs(self, targets, clamped, chains, burn_in, max_sweeps, time_budget, tolerance, seed):
+        """Run vectorized chains; returns per-chain state counts of the targets."""
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        rng = np.random.default_rng(seed)
+        size = int(np.prod([self.cardinality[t] for t in targets]))
+        # Start from likelihood-weighted draws so every chain agrees with the evidence
+        samples, _ = self._forward_sample(rng, chains, clamped)
+        free = [i for i in range(len(self.variables)) if i not in clamped]
+        counts = np.zeros((chains, size))
+        chain_ids = np.arange(chains)
+        sweeps = 0
+        while sweeps < burn_in + max_sweeps:
+            for i in free:
+                # P(X_i | Markov blanket) up to a constant, for every state at once
+                probs = self.tables[i][self._rows(samples, i)].copy()
+                saved = samples[:, i].copy()
+                for k in range(self.cardinality[i]):
+                    samples[:, i] = k
+                    for c in self.children[i]:
+                        probs[:, k] *= self.tables[c][self._rows(samples, c), samples[:, c]]
+                samples[:, i] = saved
+                totals = probs.sum(axis=1, keepdims=True)
+                # A chain stuck where every state has zero mass keeps its value
+                stuck = totals[:, 0] == 0
+                cumulative = np.cumsum(probs, axis=1) / np.where(stuck[:, None], 1.0, totals)
+                drawn = (rng.random(chains)[:, None] >= cumulative).sum(axis=1)
+                samples[:, i] = np.where(stuck, saved, np.minimum(drawn, self.cardinality[i] - 1))
+            sweeps += 1
+            if sweeps > burn_in:
+                counts[chain_ids, self._joint_index(samples, targets)] += 1
+                recorded = sweeps - burn_in
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                if tolerance is not None and recorded >= 10:
+                    if _chain_stderr(counts / recorded).max() <= tolerance:
+                        break
+        return max(sweeps - burn_in, 0), counts
+
+    def query(self, variables, evidence=None, method='likelihood_weighting', n_samples=None,
+              time_budget=None, tolerance=None, batch_size=10000, chains=1000, burn_in=50,
+              workers=1, seed=None):
+        """Estimate P(variables | evidence) within a sample, time or error budget.
+
+        Sampling stops at whichever comes first: n_samples draws (default
+        100000 when no other budget is given), time_budget seconds, or a
+        largest standard error at or below tolerance. method is
+        'likelihood_weighting' or 'gibbs'; Gibbs runs chains parallel
+        chains, so n_samples is rounded to whole sweeps over all chains.
+        With workers > 1 the budget is split over a process pool and the
+        shards are merged. Returns an Estimate.
+
+        Gibbs chains mix slowly through near-deterministic CPDs such as
+        cpd_starts, so prefer likelihood weighting unless the evidence is
+        very unlikely.
+        """
+        evidence = evidence or {}
+        targets, clamped = self._encode(variables, evidence)
+        if n_samples is None:
+            n_samples = 100000 if time_budget is None and tolerance is None else float('inf')
+        if n_samples == float('inf') and time_budget is None and tolerance is None:
+            raise ValueError("an unbounded query needs a time_budget or tolerance")
+        workers = workers or os.cpu_count()
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        # Each shard's error shrinks with sqrt(samples), so split the target accordingly
+        shard_tolerance = tolerance * math.sqrt(workers) if tolerance is not None else None
+
+        start = time.perf_counter()
+        shape = [self.cardinality[t] for t in targets]
+
+        if method == 'likelihood_weighting':
+            per_worker = math.ceil(n_samples / workers) if n_samples != float('inf') else n_samples
+            jobs = [(self._likelihood_weighting, targets, clamped, batch_size, per_worker,
+                     time_budget, shard_tolerance, s) for s in seeds]
+            shards = _run(jobs, workers)
+            n = sum(s[0] for s in shards)
+            sums = sum(s[1] for s in shards)
+            squared_sums = sum(s[2] for s in shards)
+            total = sum(s[3] for s in shards)
+            squared = sum(s[4] for s in shards)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = sums / total
+                stderr = _weighted_stderr(sums, squared_sums, total, squared)
+                effective = total * total / squared if squared else 0.0
+        elif method == 'gibbs':
+            per_worker_chains = max(1, math.ceil(chains / workers))
+            sweeps = (math.ceil(n_samples / (per_worker_chains * workers))
+                      if n_samples != float('inf') else n_samples)
+            jobs = [(self._gibbs, targets, clamped, per_worker_chains, burn_in, sweeps,
+                     time_budget, shard_tolerance, s) for s in seeds]
+            shards = _run(jobs, workers)
+            # Shards may stop after different numbers of sweeps; weight chains equally
+            per_chain = np.concatenate([counts / max(recorded, 1) for recorded, counts in shards])
+            values = per_chain.mean(axis=0)
+            stderr = _chain_stderr(per_chain)
+            n = sum(recorded * len(counts) for recorded, counts in shards)
+            effective = float(n)
+        else:
+            raise ValueError(f"unknown method {method!r}")
+
+        return Estimate(variables, {v: self.states[v] for v in variables},
+                        values.reshape(shape), stderr.reshape(shape), n, effective,
+                        time.perf_counter() - start)
+
+
+def _weighted_stderr(sums, squared_sums, total, squared):
+    """Delta-method standard error of a self-normalized weighted frequency."""
+    p = sums / total
+    variance = squared_sums * (1 - 2 * p) + p * p * squared
+    return np.sqrt(np.maximum(variance, 0.0)) / total
+
+
+def _chain_stderr(per_chain):
+    """Standard error of the mean over independent chains."""
+    if len(per_chain) < 2:
+        return np.full(per_chain.shape[1], np.nan)
+    return per_chain.std(axis=0, ddof=1) / math.sqrt(len(per_chain))
+
+
+def _call(job):
+    method, *args = job
+    return method(*args)
+
+
+def _run(jobs, workers):
+    """Run sampler shards in this process or across a process pool."""
+    if workers <= 1:
+        return [_call(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_call, jobs))
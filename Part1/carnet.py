@@ -1,86 +1,134 @@
-from pgmpy.models import DiscreteBayesianNetwork
-from pgmpy.inference import VariableElimination
-from pgmpy.factors.discrete import TabularCPD
-
-car_model = DiscreteBayesianNetwork(
-    [
-        ("Battery", "Radio"),
-        ("Battery", "Ignition"),
-        ("Ignition","Starts"),
-        ("Gas","Starts"),
-        ("KeyPresent", "Starts"),
-        ("Starts","Moves"),
-])
-
-# Defining the parameters using CPT
-
-
-cpd_battery = TabularCPD(
-    variable="Battery", variable_card=2, values=[[0.70], [0.30]],
-    state_names={"Battery":['Works',"Doesn't work"]},
-)
-
-cpd_gas = TabularCPD(
-    variable="Gas", variable_card=2, values=[[0.40], [0.60]],
-    state_names={"Gas":['Full',"Empty"]},
-)
-
-cpd_keypresent = TabularCPD(
-    variable="KeyPresent", variable_card=2, values=[[0.7], [0.3]],
-    state_names={"KeyPresent":['yes',"no"]},
-)
-
-cpd_radio = TabularCPD(
-    variable=  "Radio", variable_card=2,
-    values=[[0.75, 0.01],[0.25, 0.99]],
-    evidence=["Battery"],
-    evidence_card=[2],
-    state_names={"Radio": ["turns on", "Doesn't turn on"],
-                 "Battery": ['Works',"Doesn't work"]}
-)
-
-cpd_ignition = TabularCPD(
-    variable=  "Ignition", variable_card=2,
-    values=[[0.75, 0.01],[0.25, 0.99]],
-    evidence=["Battery"],
-    evidence_card=[2],
-    state_names={"Ignition": ["Works", "Doesn't work"],
-                 "Battery": ['Works',"Doesn't work"]}
-)
-
-# Update CPD with KeyPresent
-cpd_starts = TabularCPD(
-    variable="Starts",
-    variable_card=2,
-    values=[[0.99, 0.01, 0.01, 0.01, 0.01, 0.01, 0.01, 0.01], 
-            [0.01, 0.99, 0.99, 0.99, 0.99, 0.99, 0.99, 0.99]],
-    evidence=["Gas", "Ignition", "KeyPresent"],
-    evidence_card=[2, 2, 2],
-    state_names={"Starts":['yes','no'], 
-                 "Gas":['Full',"Empty"], 
-                 "Ignition":["Works", "Doesn't work"],
-                 "KeyPresent":['yes','no']},
-)
-
-cpd_moves = TabularCPD(
-    variable="Moves", variable_card=2,
-    values=[[0.8, 0.01],[0.2, 0.99]],
-    evidence=["Starts"],
-    evidence_card=[2],
-    state_names={"Moves": ["yes", "no"],
-                 "Starts": ['yes', 'no'] }
-)
-
-
-# Associating the parameters with the model structure
-car_model.add_cpds( cpd_starts, cpd_ignition, cpd_gas, cpd_radio, cpd_battery, cpd_moves, cpd_keypresent)
-
-car_infer = VariableElimination(car_model)
-
-print(car_infer.query(variables=["Moves"],evidence={"Radio":"turns on", "Starts":"yes"}))
+import importlib
+from functools import lru_cache
+
+# Importing this module is cheap: pgmpy is only loaded, and the network
+# only built, when get_car_network() or get_car_infer() first runs.
+
+@lru_cache(maxsize=None)
+def get_car_network():
+    """Build the car diagnosis network once per process."""
+    from pgmpy.models import DiscreteBayesianNetwork
+    from pgmpy.factors.discrete import TabularCPD
+
+    car_model = DiscreteBayesianNetwork(
+        [
+            ("Battery", "Radio"),
+            ("Battery", "Ignition"),
+            ("Ignition","Starts"),
+            ("Gas","Starts"),
+            ("KeyPresent", "Starts"),
+            ("Starts","Moves"),
+    ])
+
+    # Defining the parameters using CPT
+
+
+    cpd_battery = TabularCPD(
+        variable="Battery", variable_card=2, values=[[0.70], [0.30]],
+        state_names={"Battery":['Works',"Doesn't work"]},
+    )
+
+    cpd_gas = TabularCPD(
+        variable="Gas", variable_card=2, values=[[0.40], [0.60]],
+        state_names={"Gas":['Full',"Empty"]},
+    )
+
+    cpd_keypresent = TabularCPD(
+        variable="KeyPresent", variable_card=2, values=[[0.7], [0.3]],
+        state_names={"KeyPresent":['yes',"no"]},
+    )
+
+    cpd_radio = TabularCPD(
+        variable=  "Radio", variable_card=2,
+        values=[[0.75, 0.01],[0.25, 0.99]],
+        evidence=["Battery"],
+        evidence_card=[2],
+        state_names={"Radio": ["turns on", "Doesn't turn on"],
+                     "Battery": ['Works',"Doesn't work"]}
+    )
+
+    cpd_ignition = TabularCPD(
+        variable=  "Ignition", variable_card=2,
+        values=[[0.75, 0.01],[0.25, 0.99]],
+        evidence=["Battery"],
+        evidence_card=[2],
+        state_names={"Ignition": ["Works", "Doesn't work"],
+                     "Battery": ['Works',"Doesn't work"]}
+    )
+
+    # Update CPD with KeyPresent
+    cpd_starts = TabularCPD(
+        variable="Starts",
+        variable_card=2,
+        values=[[0.99, 0.01, 0.01, 0.01, 0.01, 0.01, 0.01, 0.01], 
+                [0.01, 0.99, 0.99, 0.99, 0.99, 0.99, 0.99, 0.99]],
+        evidence=["Gas", "Ignition", "KeyPresent"],
+        evidence_card=[2, 2, 2],
+        state_names={"Starts":['yes','no'], 
+                     "Gas":['Full',"Empty"], 
+                     "Ignition":["Works", "Doesn't work"],
+                     "KeyPresent":['yes','no']},
+    )
+
+    cpd_moves = TabularCPD(
+        variable="Moves", variable_card=2,
+        values=[[0.8, 0.01],[0.2, 0.99]],
+        evidence=["Starts"],
+        evidence_card=[2],
+        state_names={"Moves": ["yes", "no"],
+                     "Starts": ['yes', 'no'] }
+    )
+
+
+    # Associating the parameters with the model structure
+    car_model.add_cpds( cpd_starts, cpd_ignition, cpd_gas, cpd_radio, cpd_battery, cpd_moves, cpd_keypresent)
+    return car_model
+
+
+@lru_cache(maxsize=None)
+def get_car_infer():
+    """Compile the car network for inference once per process."""
+    from compiled_inference import CompiledInference
+    return CompiledInference(get_car_network())
+
+
+# The CPDs used to be module globals; they are looked up on the built network
+_CPD_VARIABLES = {
+    "cpd_battery": "Battery",
+    "cpd_gas": "Gas",
+    "cpd_keypresent": "KeyPresent",
+    "cpd_radio": "Radio",
+    "cpd_ignition": "Ignition",
+    "cpd_starts": "Starts",
+    "cpd_moves": "Moves",
+}
+
+# Names the module used to import at the top level
+_IMPORTED = {
+    "DiscreteBayesianNetwork": "pgmpy.models",
+    "TabularCPD": "pgmpy.factors.discrete",
+    "CompiledInference": "compiled_inference",
+}
+
+
+def __getattr__(name):
+    # The old module attributes stay importable, built on first access
+    if name == 'car_model':
+        return get_car_network()
+    if name == 'car_infer':
+        return get_car_infer()
+    if name in _CPD_VARIABLES:
+        return get_car_network().get_cpds(_CPD_VARIABLES[name])
+    if name in _IMPORTED:
+        return getattr(importlib.import_module(_IMPORTED[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def main():
+    car_infer = get_car_infer()
+
+    print(car_infer.query(variables=["Moves"],evidence={"Radio":"turns on", "Starts":"yes"}))
+
     print("=== Car Network Queries ===")
 
     # Query 1: Battery not working given car will not move
@@ -0,0 +1,341 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from pgmpy.factors.discrete import DiscreteFactor
+from pgmpy.inference import VariableElimination
+
+
+class CompiledInference:
+    """Exact inference on a junction tree compiled once per network.
+
+    Drop-in for VariableElimination.query. Clique potentials are numpy
+    arrays whose axes follow one fixed variable order, so a message is
+    a sum over axes and a product is a broadcast. Calibrated clique
+    beliefs are cached per evidence set, and query results per
+    (variables, evidence), so repeated queries cost a dictionary lookup
+    and new queries under known evidence cost one marginalization.
+    Joint queries whose variables share no clique fall back to
+    VariableElimination, whose results are cached the same way.
+    """
+
+    def __init__(self, model, cache_size=1024):
+        self.model = model
+        self.cache_size = cache_size
+        self._beliefs = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        # Hits and misses of the result cache
+        self.hits = 0
+        self.misses = 0
+        self._compile()
+
+    def _compile(self):
+        """Build the junction tree and clique potentials from the model's current CPDs."""
+        model = self.model
+        self.variables = list(model.nodes())
+        self.axis = {v: i for i, v in enumerate(self.variables)}
+        self.states = {v: list(model.get_cpds(v).state_names[v]) for v in self.variables}
+        self.state_index = {v: {s: i for i, s in enumerate(states)}
+                            for v, states in self.states.items()}
+        self.cardinality = {v: len(states) for v, states in self.states.items()}
+
+        junction_tree = model.to_junction_tree()
+        self.cliques = [tuple(sorted(c, key=self.axis.get)) for c in junction_tree.nodes()]
+        clique_id = {frozenset(c): i for i, c in enumerate(self.cliques)}
+        neighbors = [[] for _ in self.cliques]
+        for a, b in junction_tree.edges():
+            i, j = clique_id[frozenset(a)], clique_id[frozenset(b)]
+            neighbors[i].append(j)
+            neighbors[j].append(i)
+
+        # Root each tree of the forest; order lists parents before children
+        self.parent = [None] * len(self.cliques)
+        self.children = [[] for _ in self.cliques]
+        self.order = []
+        seen = set()
+        for root in range(len(self.cliques)):
+            if root in seen:
+                continue
+            seen.add(root)
+            frontier = [root]
+            while frontier:
+                i = frontier.pop()
+                self.order.append(i)
+                for j in neighbors[i]:
+                    if j not in seen:
+                        seen.add(j)
+                        self.parent[j] = i
+                        self.children[i].append(j)
+                        frontier.append(j)
+        self.separator = [None if p is None else tuple(v for v in self.cliques[i] if v in self.cliques[p])
+                          for i, p in enumerate(self.parent)]
+
+        # Smallest clique holding each variable, where its evidence is entered
+        self.home = {}
+        for i, clique in enumerate(self.cliques):
+            for v in clique:
+                if v not in self.home or len(clique) < len(self.cliques[self.home[v]]):
+                    self.home[v] = i
+
+        self.potentials = [np.ones([self.cardinality[v] for v in c]) for c in self.cliques]
+        for cpd in model.get_cpds():
+            scope = set(cpd.scope())
+            i = min((i for i, c in enumerate(self.cliques) if scope <= set(c)),
+                    key=lambda i: len(self.cliques[i]))
+            self.potentials[i] = self.potentials[i] * self._aligned(cpd.to_factor(), self.cliques[i])
+
+        self._fallback = VariableElimination(model)
+
+    def _aligned(self, factor, clique):
+        """Factor values with axes in clique order, size 1 along absent variables."""
+        variables = list(factor.variables)
+        values = factor.values
+        # pgmpy factors may order their states differently from the model
+        for axis, v in enumerate(variables):
+            order = [factor.state_names[v].index(s) for s in self.states[v]]
+            values = np.take(values, order, axis=axis)
+        ordered = sorted(variables, key=self.axis.get)
+        values = np.transpose(values, [variables.index(v) for v in ordered])
+        return values.reshape([self.cardinality[v] if v in variables else 1 for v in clique])
+
+    # Calibration works on a batch of evidence rows at once: every message
+    # and belief carries a leading row axis, of size 1 where it is shared
+
+    def _expand(self, message, variables, clique):
+        """Reshape a batched message over variables so it broadcasts across a clique."""
+        return message.reshape([message.shape[0]] + [self.cardinality[v] if v in variables else 1
+                                                     for v in clique])
+
+    @staticmethod
+    def _sum_to(values, clique, keep):
+        """Sum out every clique variable not in keep, keeping the row axis."""
+        axes = tuple(i + 1 for i, v in enumerate(clique) if v not in keep)
+        return values.sum(axis=axes) if axes else values
+
+    def _calibrate(self, evidence):
+        """Return the clique beliefs under one evidence set."""
+        indicators = {}
+        for v, state in evidence:
+            indicator = np.zeros((1, self.cardinality[v]))
+            indicator[0, self.state_index[v][state]] = 1.0
+            indicators[v] = indicator
+        return [belief[0] for belief in self._calibrate_batch(indicators)]
+
+    def _calibrate_batch(self, indicators):
+        """Run both message passes for rows of evidence given as {variable: (rows, card)} indicators."""
+        potentials = [p[np.newaxis] for p in self.potentials]
+        for v, indicator in indicators.items():
+            i = self.home[v]
+            potentials[i] = potentials[i] * self._expand(indicator, (v,), self.cliques[i])
+
+        # Collect: each clique sends its parent the sum over non-separator variables
+        upward = [None] * len(self.cliques)
+        inner = [None] * len(self.cliques)
+        for i in reversed(self.order):
+            product = potentials[i]
+            for j in self.children[i]:
+                product = product * self._expand(upward[j], self.separator[j], self.cliques[i])
+            inner[i] = product
+            if self.parent[i] is not None:
+                upward[i] = self._sum_to(product, self.cliques[i], self.separator[i])
+
+        # Distribute: a child hears from everything outside its own subtree
+        downward = [None] * len(self.cliques)
+        beliefs = [None] * len(self.cliques)
+        for i in self.order:
+            clique = self.cliques[i]
+            outside = 1.0 if downward[i] is None else self._expand(downward[i], self.separator[i], clique)
+            beliefs[i] = inner[i] * outside
+            for j in self.children[i]:
+                product = potentials[i] * outside
+                for k in self.children[i]:
+                    if k != j:
+                        product = product * self._expand(upward[k], self.separator[k], clique)
+                downward[j] = self._sum_to(product, clique, self.separator[j])
+        return beliefs
+
+    def _cached(self, cache, key, compute):
+        """LRU lookup in cache, computing and storing the value on a miss."""
+        with self._lock:
+            value = cache.get(key)
+            if cache is self._results:
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if value is not None:
+                cache.move_to_end(key)
+                return value
+        value = compute()
+        with self._lock:
+            cache[key] = value
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return value
+
+    def query(self, variables, evidence=None, joint=True, show_progress=False):
+        """Return P(variables | evidence) as a DiscreteFactor, like VariableElimination.query.
+
+        With joint=False a dict of single-variable marginals is returned.
+        """
+        evidence = evidence or {}
+        if not joint:
+            return {v: self.query([v], evidence) for v in variables}
+
+        common = set(variables) & set(evidence)
+        if common:
+            raise ValueError(f"Can't have the same variables in both `variables` and `evidence`. "
+                             f"Found in both: {common}")
+        for v, state in evidence.items():
+            if state not in self.state_index[v]:
+                raise ValueError(f"{state!r} is not a state of {v}")
+
+        evidence_key = tuple(sorted(evidence.items()))
+        key = (tuple(variables), evidence_key)
+        factor = self._cached(self._results, key, lambda: self._answer(variables, evidence, evidence_key))
+        # Callers may normalize or reduce in place, so never hand out the cached factor
+        return factor.copy()
+
+    def _answer(self, variables, evidence, evidence_key):
+        wanted = set(variables)
+        holding = [i for i, c in enumerate(self.cliques) if wanted <= set(c)]
+        if not holding:
+            return self._fallback.query(variables, evidence, show_progress=False)
+
+        i = min(holding, key=lambda i: len(self.cliques[i]))
+        beliefs = self._cached(self._beliefs, evidence_key, lambda: self._calibrate(evidence_key))
+        clique = self.cliques[i]
+        marginal = self._sum_to(beliefs[i][np.newaxis], clique, wanted)[0]
+        kept = [v for v in clique if v in wanted]
+        marginal = np.transpose(marginal, [kept.index(v) for v in variables])
+        return DiscreteFactor(list(variables), [self.cardinality[v] for v in variables],
+                              marginal / marginal.sum(),
+                              state_names={v: self.states[v] for v in variables})
+
+    def query_batch(self, variables, evidence, columns=None, chunk_size=4096):
+        """Return P(variables | row) for every row of an evidence table at once.
+
+        evidence is a pandas DataFrame or a dict of equal-length columns
+        keyed by variable name, or a 2-D array whose column names are given
+        in columns. Cells hold state names, with None, NaN or '' for an
+        unobserved value, or integer state indices with -1 for missing.
+        Identical rows are solved once and the distinct ones are calibrated
+        together in chunks of chunk_size. Returns an array of shape
+        (rows, *cardinalities of variables), states in self.states order;
+        rows whose evidence is impossible come back as NaN.
+        """
+        variables = list(variables)
+        if columns is None:
+            columns = list(evidence.keys())
+            cells = [np.asarray(evidence[v]) for v in columns]
+        else:
+            evidence = np.asarray(evidence)
+            cells = [evidence[:, k] for k in range(len(columns))]
+        common = set(variables) & set(columns)
+        if common:
+            raise ValueError(f"Can't have the same variables in both `variables` and `evidence`. "
+                             f"Found in both: {common}")
+
+        n_rows = len(cells[0]) if cells else 1
+        codes = np.stack([encode_states(v, self.state_index[v], c) for v, c in zip(columns, cells)], axis=1) \
+            if cells else np.zeros((1, 0), dtype=np.intp)
+
+        # Repeated evidence patterns are solved once. A mixed-radix key per row
+        # is fastest to deduplicate, but only while every key fits in int64
+        radix = 1
+        for v in columns:
+            radix *= self.cardinality[v] + 1
+        if radix <= np.iinfo(np.int64).max:
+            keys = np.zeros(len(codes), dtype=np.int64)
+            for k, v in enumerate(columns):
+                keys = keys * (self.cardinality[v] + 1) + codes[:, k] + 1
+            _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        else:
+            _, first, inverse = np.unique(codes, axis=0, return_index=True, return_inverse=True)
+        patterns = codes[first]
+
+        shape = [self.cardinality[v] for v in variables]
+        posteriors = np.empty([len(patterns)] + shape)
+        wanted = set(variables)
+        holding = [i for i, c in enumerate(self.cliques) if wanted <= set(c)]
+        if holding:
+            i = min(holding, key=lambda i: len(self.cliques[i]))
+            clique = self.cliques[i]
+            kept = [v for v in clique if v in wanted]
+            for start in range(0, len(patterns), chunk_size):
+                chunk = patterns[start:start + chunk_size]
+                indicators = {}
+                for k, v in enumerate(columns):
+                    observed = chunk[:, k] >= 0
+                    indicator = np.ones((len(chunk), self.cardinality[v]))
+                    indicator[observed] = np.eye(self.cardinality[v])[chunk[observed, k]]
+                    indicators[v] = indicator
+                belief = self._calibrate_batch(indicators)[i]
+                marginal = self._sum_to(np.broadcast_to(belief, (len(chunk),) + belief.shape[1:]),
+                                        clique, wanted)
+                marginal = np.transpose(marginal, [0] + [kept.index(v) + 1 for v in variables])
+                totals = marginal.reshape(len(chunk), -1).sum(axis=1)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    posteriors[start:start + len(chunk)] = marginal / totals.reshape([-1] + [1] * len(shape))
+        else:
+            # Variables spread over several cliques: answer each pattern on its own
+            for row, pattern in enumerate(patterns):
+                row_evidence = {v: self.states[v][code] for v, code in zip(columns, pattern) if code >= 0}
+                posteriors[row] = self.query(variables, row_evidence).values
+
+        return posteriors[inverse.reshape(-1)] if cells else np.repeat(posteriors, n_rows, axis=0)
+
+    def cache_stats(self):
+        """Return hit/miss counters of the result and belief caches."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'results': len(self._results),
+                'beliefs': len(self._beliefs),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def recompile(self):
+        """Rebuild from the model's current CPDs and drop every cached answer.
+
+        Call it after model.add_cpds() replaces tables, e.g. with ones from
+        cpd_learning.learn_cpds. Queries running at the same time may still
+        see the old tables.
+        """
+        with self._lock:
+            self._compile()
+            self._results.clear()
+            self._beliefs.clear()
+
+    def clear_cache(self):
+        """Drop cached results and beliefs; the model is recompiled as well,
+        so answers always follow its current CPDs."""
+        self.recompile()
+
+
+def encode_states(variable, state_index, values):
+    """Map a column of states to state indices, -1 where unobserved.
+
+    values holds state names, with None, NaN or '' for missing, or integer
+    state indices with -1 (or NaN, as pandas stores them) for missing.
+    """
+    values = np.asarray(values)
+    card = len(state_index)
+    if values.dtype.kind in 'iu':
+        codes = values.astype(np.intp)
+    elif values.dtype.kind == 'f' and np.all(np.isnan(values) | (values == np.round(values))):
+        codes = np.where(np.isnan(values), -1, values).astype(np.intp)
+    else:
+        codes = np.full(len(values), -1, dtype=np.intp)
+        for state, index in state_index.items():
+            codes[values == state] = index
+        for value in set(values[codes < 0].tolist()):
+            if not (value is None or value == '' or value != value):
+                raise ValueError(f"{value!r} is not a state of {variable}")
+        return codes
+    if (codes >= card).any():
+        raise ValueError(f"state index out of range for {variable}")
+    return np.where(codes < 0, -1, codes)
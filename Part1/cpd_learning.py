@@ -0,0 +1,132 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from pgmpy.factors.discrete import TabularCPD
+
+from compiled_inference import encode_states
+
+
+class CPDCounts:
+    """Sufficient statistics for the CPDs of a fixed network structure.
+
+    For every variable an int64 array of shape (parent configurations,
+    states) counts how often each state was seen under each parent
+    configuration. Counts only ever add up, so chunks can be counted in
+    any order and shards merged with merge(); memory stays the size of
+    the CPD tables no matter how many rows are streamed.
+    """
+
+    def __init__(self, parents, states):
+        # parents: {variable: [parent, ...]}, states: {variable: [state, ...]}
+        self.parents = {v: list(p) for v, p in parents.items()}
+        self.states = {v: list(s) for v, s in states.items()}
+        self.state_index = {v: {s: i for i, s in enumerate(states)}
+                            for v, states in self.states.items()}
+        self.cardinality = {v: len(s) for v, s in self.states.items()}
+        self.counts = {v: np.zeros((int(np.prod([self.cardinality[p] for p in self.parents[v]])),
+                                    self.cardinality[v]), dtype=np.int64)
+                       for v in self.parents}
+        self.rows = 0
+
+    @classmethod
+    def for_model(cls, model, states=None):
+        """Counts for a DiscreteBayesianNetwork, parents ordered as in its CPDs.
+
+        states defaults to the state names of the model's current CPDs.
+        """
+        parents = {}
+        for v in model.nodes():
+            cpd = model.get_cpds(v)
+            parents[v] = list(cpd.variables[1:]) if cpd is not None else sorted(model.get_parents(v))
+        if states is None:
+            states = {v: model.get_cpds(v).state_names[v] for v in model.nodes()}
+        return cls(parents, states)
+
+    def update(self, chunk):
+        """Count one chunk: a DataFrame or dict of equal-length columns.
+
+        A row only counts toward a variable's CPD when that variable and all
+        of its parents are observed; missing cells (None, NaN, '') skip it
+        for that family alone.
+        """
+        codes = {v: encode_states(v, self.state_index[v], chunk[v])
+                 for v in self.parents if v in chunk}
+        if not codes:
+            return
+        self.rows += len(next(iter(codes.values())))
+        for v, parents in self.parents.items():
+            if v not in codes or any(p not in codes for p in parents):
+                continue
+            family = [codes[p] for p in parents] + [codes[v]]
+            observed = np.logical_and.reduce([c >= 0 for c in family])
+            cells = np.ravel_multi_index(tuple(c[observed] for c in family),
+                                         tuple(self.cardinality[u] for u in parents + [v]))
+            self.counts[v] += np.bincount(cells, minlength=self.counts[v].size).reshape(
+                self.counts[v].shape)
+
+    def merge(self, other):
+        """Add another shard's counts into this one."""
+        for v, counts in other.counts.items():
+            self.counts[v] += counts
+        self.rows += other.rows
+        return self
+
+    def to_cpds(self, pseudo_count=1.0):
+        """Return TabularCPDs estimated with a symmetric Dirichlet prior.
+
+        Each cell gets pseudo_count extra observations, so parent
+        configurations never seen in the data fall back to uniform.
+        """
+        cpds = []
+        for v, parents in self.parents.items():
+            counts = self.counts[v] + pseudo_count
+            totals = counts.sum(axis=1, keepdims=True)
+            # Unseen configurations with pseudo_count=0 stay uniform rather than 0/0
+            probs = np.divide(counts, totals, out=np.full(counts.shape, 1.0 / self.cardinality[v]),
+                              where=totals > 0)
+            cpds.append(TabularCPD(
+                variable=v, variable_card=self.cardinality[v], values=probs.T.tolist(),
+                evidence=parents or None,
+                evidence_card=[self.cardinality[p] for p in parents] or None,
+                state_names={u: self.states[u] for u in [v] + parents}))
+        return cpds
+
+
+def iter_csv_chunks(path, chunk_rows=100000):
+    """Read a CSV with a header row as DataFrames of chunk_rows rows; empty cells are missing."""
+    # pandas comes with pgmpy; its C parser is far faster than the csv module
+    import pandas as pd
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=str,
+                           keep_default_na=False, na_values=[''])
+
+
+def count_chunks(counts, chunks):
+    """Fold an iterable of chunks (DataFrames, dicts, Parquet row groups) into counts."""
+    for chunk in chunks:
+        counts.update(chunk)
+    return counts
+
+
+def _count_csv(job):
+    parents, states, path, chunk_rows = job
+    return count_chunks(CPDCounts(parents, states), iter_csv_chunks(path, chunk_rows))
+
+
+def learn_cpds(model, paths, chunk_rows=100000, workers=1, pseudo_count=1.0, states=None):
+    """Estimate every CPD of model from CSV files, one shard per file.
+
+    Files are counted in parallel by a process pool and the shard counts
+    merged before smoothing. Returns (cpds, counts); pass the cpds to
+    model.add_cpds to replace the hand-written tables, then call
+    recompile() on any CompiledInference built from the model.
+    """
+    template = CPDCounts.for_model(model, states)
+    jobs = [(template.parents, template.states, path, chunk_rows) for path in paths]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shards = list(pool.map(_count_csv, jobs))
+    else:
+        shards = [_count_csv(job) for job in jobs]
+    for shard in shards:
+        template.merge(shard)
+    return template.to_cpds(pseudo_count), template
@@ -0,0 +1,141 @@
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+from pgmpy.inference import VariableElimination
+from pgmpy.sampling import BayesianModelSampling
+
+from alarm import get_alarm_network
+from carnet import get_car_network
+from compiled_inference import CompiledInference
+from cpd_learning import learn_cpds
+
+
+def random_query(infer, rng):
+    """A random (variables, evidence) pair over the compiled network's variables."""
+    variables = list(infer.variables)
+    rng.shuffle(variables)
+    n_query = rng.randint(1, 2)
+    n_evidence = rng.randint(0, min(3, len(variables) - n_query))
+    query = variables[:n_query]
+    evidence = {v: rng.choice(infer.states[v]) for v in variables[n_query:n_query + n_evidence]}
+    return query, evidence
+
+
+def reference(exact, infer, query, evidence):
+    """VariableElimination's answer with axes and states in CompiledInference order, or None."""
+    try:
+        factor = exact.query(variables=query, evidence=evidence, show_progress=False)
+    except ValueError:
+        # Evidence of probability zero
+        return None
+    values = factor.values
+    for axis, v in enumerate(factor.variables):
+        values = np.take(values, [factor.state_names[v].index(s) for s in infer.states[v]], axis=axis)
+    values = np.transpose(values, [factor.variables.index(v) for v in query])
+    return None if np.isnan(values).any() else values
+
+
+def check_queries(name, model, infer, rng, n_queries=200):
+    """Compare infer.query and query_batch against VariableElimination; returns the mismatches."""
+    exact = VariableElimination(model)
+    failures = 0
+    for _ in range(n_queries):
+        query, evidence = random_query(infer, rng)
+        expected = reference(exact, infer, query, evidence)
+        if expected is None:
+            continue
+        if not np.allclose(infer.query(query, evidence).values, expected):
+            print(f"  {name}: query {query} | {evidence} differs from VariableElimination")
+            failures += 1
+
+    # One batch per query set, every row solved again on its own
+    for _ in range(n_queries // 20):
+        query, _ = random_query(infer, rng)
+        columns = [v for v in infer.variables if v not in query]
+        rows = [{v: rng.choice(infer.states[v] + [None]) for v in columns} for _ in range(50)]
+        batch = infer.query_batch(query, {v: [r[v] for r in rows] for v in columns})
+        for row, answer in zip(rows, batch):
+            evidence = {v: s for v, s in row.items() if s is not None}
+            expected = reference(exact, infer, query, evidence)
+            if expected is None:
+                if not np.isnan(answer).all():
+                    print(f"  {name}: query_batch {query} | {evidence} should be NaN")
+                    failures += 1
+            elif not np.allclose(answer, expected):
+                print(f"  {name}: query_batch {query} | {evidence} differs from VariableElimination")
+                failures += 1
+    return failures
+
+
+def check_learning(model, n_rows=200000, shards=2, tolerance=0.01):
+    """Sample data from model and relearn its CPDs from CSV shards.
+
+    Returns (mismatches, learned cpds).
+    """
+    data = BayesianModelSampling(model).forward_sample(size=n_rows, seed=0, show_progress=False)
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for k in range(shards):
+            paths.append(os.path.join(directory, f"shard{k}.csv"))
+            data.iloc[k * n_rows // shards:(k + 1) * n_rows // shards].to_csv(paths[-1], index=False)
+        cpds, counts = learn_cpds(model, paths, chunk_rows=n_rows // 7, workers=shards, pseudo_count=0)
+
+    if counts.rows != n_rows:
+        print(f"  counted {counts.rows} rows, expected {n_rows}")
+        failures += 1
+    for learned in cpds:
+        original = model.get_cpds(learned.variable)
+        # Parents come in the original's order; align the states as well
+        values = learned.values
+        for axis, v in enumerate(learned.variables):
+            values = np.take(values, [learned.state_names[v].index(s) for s in original.state_names[v]],
+                             axis=axis)
+        error = np.abs(values - original.values).max()
+        if error > tolerance:
+            print(f"  learned CPD of {learned.variable} is off by {error:.4f}")
+            failures += 1
+    return failures, cpds
+
+
+def inference_check():
+    """Check compiled inference and CPD learning against pgmpy; exits non-zero on any mismatch."""
+    rng = random.Random(0)
+    failures = 0
+
+    print("="*60)
+    print("COMPILED INFERENCE vs VARIABLE ELIMINATION")
+    print("="*60)
+    for name, build in [("alarm", get_alarm_network), ("car", get_car_network)]:
+        model = build()
+        found = check_queries(name, model, CompiledInference(model), rng)
+        print(f"{name:>6}: {'ok' if not found else f'{found} mismatches'}")
+        failures += found
+
+    print("\n" + "="*60)
+    print("CPD RECOVERY FROM SAMPLED DATA")
+    print("="*60)
+    model = get_car_network().copy()
+    infer = CompiledInference(model)
+    found, cpds = check_learning(model)
+    print(f"   car: {'ok' if not found else f'{found} mismatches'}")
+    failures += found
+
+    # The learned tables must reach an engine compiled before they were added
+    model.add_cpds(*cpds)
+    infer.recompile()
+    found = check_queries("car (learned)", model, infer, rng, n_queries=50)
+    print(f"   car with learned CPDs after recompile(): {'ok' if not found else f'{found} mismatches'}")
+    failures += found
+
+    if failures:
+        print(f"\nFAILED: {failures} mismatches")
+        sys.exit(1)
+    print("\nAll checks passed.")
+
+
+if __name__ == "__main__":
+    inference_check()
@@ -0,0 +1,274 @@
+import threading
+
+import numpy as np
+
+# Backpointer codes; the tie-break order D < I < S matches align_full
+NONE, MATCH, DELETE, INSERT, SUBSTITUTE = range(5)
+INF = 1 << 30
+
+
+def align_full(correct_word, misspelled_word):
+    """Align two words over the full (m+1) x (n+1) edit-distance table."""
+    m, n = len(correct_word), len(misspelled_word)
+
+    # Create DP table
+    dp = [[0] * (n + 1) for _ in range(m + 1)]
+    path = [[None] * (n + 1) for _ in range(m + 1)]
+
+    # Initialize base cases
+    for i in range(m + 1):
+        dp[i][0] = i
+        path[i][0] = 'D'  # Deletion
+    for j in range(n + 1):
+        dp[0][j] = j
+        path[0][j] = 'I'  # Insertion
+
+    # Fill DP table
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if correct_word[i-1] == misspelled_word[j-1]:
+                dp[i][j] = dp[i-1][j-1]
+                path[i][j] = 'M'  # Match
+            else:
+                # Find minimum cost operation
+                costs = [
+                    (dp[i-1][j] + 1, 'D'),      # Deletion
+                    (dp[i][j-1] + 1, 'I'),      # Insertion
+                    (dp[i-1][j-1] + 1, 'S')     # Substitution
+                ]
+                min_cost, operation = min(costs)
+                dp[i][j] = min_cost
+                path[i][j] = operation
+
+    # Backtrack to find alignment
+    aligned = []
+    i, j = m, n
+
+    while i > 0 and j > 0:
+        if path[i][j] == 'M':
+            aligned.append((correct_word[i-1], misspelled_word[j-1]))
+            i -= 1
+            j -= 1
+        elif path[i][j] == 'D':
+            aligned.append((correct_word[i-1], None))
+            i -= 1
+        elif path[i][j] == 'I':
+            aligned.append((None, misspelled_word[j-1]))
+            j -= 1
+        else:  # 'S' - Substitution
+            aligned.append((correct_word[i-1], misspelled_word[j-1]))
+            i -= 1
+            j -= 1
+
+    # Handle remaining characters
+    while i > 0:
+        aligned.append((correct_word[i-1], None))
+        i -= 1
+    while j > 0:
+        aligned.append((None, misspelled_word[j-1]))
+        j -= 1
+
+    aligned.reverse()
+    return aligned
+
+
+class BandedAligner:
+    """Edit-distance aligner that fills only a diagonal band of the table.
+
+    Typos are usually within a few edits, so only cells with |i - j| <= band
+    are computed. If the distance turns out larger than the band, the
+    alignment could have left it and the full table is used instead. Cost
+    and backpointer buffers are reused across calls.
+    """
+
+    def __init__(self, band=3):
+        self.band = band
+        self._cost = []
+        self._ops = bytearray()
+        self._blank = []
+
+    def align(self, correct_word, misspelled_word):
+        """Return the same alignment as align_full, computed over the band."""
+        m, n = len(correct_word), len(misspelled_word)
+        k = max(self.band, abs(m - n))
+        if k >= max(m, n):
+            return align_full(correct_word, misspelled_word)
+
+        # Each row stores band cells j - i in [-k, k] plus an INF sentinel
+        # on both sides, so neighbours outside the band read as INF
+        stride = 2 * k + 3
+        size = (m + 1) * stride
+        if len(self._cost) < size:
+            self._cost = [INF] * size
+            self._ops = bytearray(size)
+        if len(self._blank) != stride:
+            self._blank = [INF] * stride
+        cost = self._cost
+        ops = self._ops
+
+        for i in range(m + 1):
+            row = i * stride
+            cost[row:row + stride] = self._blank
+            base = row - i + k + 1  # index of cell (i, j) is base + j
+            for j in range(max(0, i - k), min(n, i + k) + 1):
+                idx = base + j
+                if i == 0:
+                    cost[idx] = j
+                    ops[idx] = INSERT
+                elif j == 0:
+                    cost[idx] = i
+                    ops[idx] = DELETE
+                elif correct_word[i-1] == misspelled_word[j-1]:
+                    cost[idx] = cost[idx - stride]
+                    ops[idx] = MATCH
+                else:
+                    best = cost[idx - stride + 1] + 1
+                    op = DELETE
+                    c = cost[idx - 1] + 1
+                    if c < best:
+                        best, op = c, INSERT
+                    c = cost[idx - stride] + 1
+                    if c < best:
+                        best, op = c, SUBSTITUTE
+                    cost[idx] = best
+                    ops[idx] = op
+
+        # Inside the band every cell with cost <= k is exact, so the traceback
+        # below only matches the full table when the distance fits the band
+        if cost[m * stride - m + k + 1 + n] > k:
+            return align_full(correct_word, misspelled_word)
+
+        return self._traceback(correct_word, misspelled_word, ops, stride, k)
+
+    @staticmethod
+    def _traceback(correct_word, misspelled_word, ops, stride, k):
+        aligned = []
+        i, j = len(correct_word), len(misspelled_word)
+
+        while i > 0 and j > 0:
+            op = ops[i * stride - i + k + 1 + j]
+            if op == MATCH or op == SUBSTITUTE:
+                aligned.append((correct_word[i-1], misspelled_word[j-1]))
+                i -= 1
+                j -= 1
+            elif op == DELETE:
+                aligned.append((correct_word[i-1], None))
+                i -= 1
+            else:
+                aligned.append((None, misspelled_word[j-1]))
+                j -= 1
+
+        while i > 0:
+            aligned.append((correct_word[i-1], None))
+            i -= 1
+        while j > 0:
+            aligned.append((None, misspelled_word[j-1]))
+            j -= 1
+
+        aligned.reverse()
+        return aligned
+
+    def align_many(self, pairs, min_batch=64):
+        """Align many (correct, misspelled) pairs, batching equal-length pairs in NumPy.
+
+        Pairs are grouped by (len(correct), len(misspelled)); groups smaller
+        than min_batch are aligned one at a time, where NumPy overhead would
+        outweigh the batching.
+        """
+        results = [None] * len(pairs)
+        groups = {}
+        for index, (correct_word, misspelled_word) in enumerate(pairs):
+            groups.setdefault((len(correct_word), len(misspelled_word)), []).append(index)
+
+        for (m, n), indices in groups.items():
+            k = max(self.band, abs(m - n))
+            if len(indices) < min_batch or k >= max(m, n):
+                for index in indices:
+                    results[index] = self.align(*pairs[index])
+                continue
+
+            correct = np.array([[ord(c) for c in pairs[index][0]] for index in indices], dtype=np.int32)
+            typed = np.array([[ord(c) for c in pairs[index][1]] for index in indices], dtype=np.int32)
+            distance, ops = _banded_batch(correct, typed, k)
+
+            for row, index in enumerate(indices):
+                correct_word, misspelled_word = pairs[index]
+                if distance[row] > k:
+                    results[index] = align_full(correct_word, misspelled_word)
+                else:
+                    results[index] = self._traceback(correct_word, misspelled_word,
+                                                     ops[:, row].tobytes(), 2 * k + 3, k)
+
+        return results
+
+
+def _banded_batch(correct, typed, k):
+    """Fill the band for a (B, m) x (B, n) batch; return distances and ops.
+
+    ops has shape ((m + 1) * stride, B) with the same flat cell layout as
+    BandedAligner, so each column can be traced back on its own.
+    """
+    B, m = correct.shape
+    n = typed.shape[1]
+    stride = 2 * k + 3
+    cost = np.full(((m + 1) * stride, B), INF, dtype=np.int64)
+    ops = np.zeros(((m + 1) * stride, B), dtype=np.uint8)
+
+    for i in range(m + 1):
+        base = i * stride - i + k + 1
+        for j in range(max(0, i - k), min(n, i + k) + 1):
+            idx = base + j
+            if i == 0:
+                cost[idx] = j
+                ops[idx] = INSERT
+            elif j == 0:
+                cost[idx] = i
+                ops[idx] = DELETE
+            else:
+                best = cost[idx - stride + 1] + 1
+                op = np.full(B, DELETE, dtype=np.uint8)
+                c = cost[idx - 1] + 1
+                better = c < best
+                best = np.where(better, c, best)
+                op[better] = INSERT
+                c = cost[idx - stride] + 1
+                better = c < best
+                best = np.where(better, c, best)
+                op[better] = SUBSTITUTE
+
+                match = correct[:, i-1] == typed[:, j-1]
+                cost[idx] = np.where(match, cost[idx - stride], best)
+                op[match] = MATCH
+                ops[idx] = op
+
+    return cost[m * stride - m + k + 1 + n], ops
+
+
+_local = threading.local()
+
+
+def align(correct_word, misspelled_word):
+    """Align with a per-thread BandedAligner so buffers are never shared."""
+    aligner = getattr(_local, 'aligner', None)
+    if aligner is None:
+        aligner = _local.aligner = BandedAligner()
+    return aligner.align(correct_word, misspelled_word)
+
+
+def edit_distance(a, b, max_distance=None):
+    """Levenshtein distance, or max_distance + 1 once it is known to exceed it."""
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j-1] + 1,
+                               previous[j-1] + (ca != cb)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
@@ -0,0 +1,42 @@
+import time
+
+from hidden_markov import SpellingFixerHMM
+from simple_test import ADDITIONAL_TESTS, TEST_CASES
+
+def beam_test():
+    """Compare beam decoding with exact Viterbi on the simple_test cases."""
+    print("Loading HMM spelling fixer...")
+    fixer = SpellingFixerHMM('aspell.txt')
+
+    single_words = [(w, e) for w, e in TEST_CASES if len(w.split()) == 1]
+    # Decode through the HMM directly; correct_text would answer most of
+    # these from the word_corrections lookup and hide any difference
+    hmm_words = [w for w, _ in single_words] + ADDITIONAL_TESTS
+
+    exact_outputs = [fixer.viterbi_decode(w) for w in hmm_words]
+    exact_correct = sum(fixer.correct_text(w) == e for w, e in single_words)
+
+    print("\n" + "="*60)
+    print(f"BEAM DECODING VS EXACT VITERBI ({len(fixer.states)} states)")
+    print("="*60)
+    print(f"{'beam':>10} {'threshold':>10} {'agree':>8} {'accuracy':>9} {'us/word':>9}")
+
+    for beam_width, threshold in [(None, None), (20, None), (10, None), (5, None),
+                                  (3, None), (1, None), (None, 10.0), (None, 5.0), (5, 5.0)]:
+        fixer.beam_width = beam_width
+        fixer.beam_threshold = threshold
+
+        start = time.perf_counter()
+        outputs = [fixer.viterbi_decode(w) for w in hmm_words]
+        elapsed = (time.perf_counter() - start) / len(hmm_words) * 1e6
+
+        agree = sum(o == e for o, e in zip(outputs, exact_outputs))
+        correct = sum(fixer.correct_text(w) == e for w, e in single_words)
+        label = 'exact' if beam_width is None and threshold is None else str(beam_width)
+        print(f"{label:>10} {str(threshold):>10} {agree:>4}/{len(hmm_words):<3} "
+              f"{correct:>4}/{len(single_words):<4} {elapsed:>9.1f}")
+
+    print(f"\nExact Viterbi single word accuracy: {exact_correct}/{len(single_words)}")
+
+if __name__ == "__main__":
+    beam_test()
@@ -0,0 +1,71 @@
+import random
+import sys
+import time
+
+from aligner import BandedAligner, align_full
+from hidden_markov import SpellingFixerHMM
+
+def load_pairs(aspell_file):
+    """Read all (correct, misspelled) pairs from an aspell file."""
+    pairs = []
+    with open(aspell_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            parsed = SpellingFixerHMM._parse_aspell_line(line)
+            if parsed:
+                correct_word, misspellings = parsed
+                pairs.extend((correct_word, m) for m in misspellings)
+    return pairs
+
+def mutate(word, rng, edits):
+    """Apply random single-character edits to a word."""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    chars = list(word)
+    for _ in range(edits):
+        position = rng.randrange(len(chars) + 1)
+        kind = rng.choice('dis') if chars else 'i'
+        if kind == 'd' and position < len(chars):
+            del chars[position]
+        elif kind == 's' and position < len(chars):
+            chars[position] = rng.choice(letters)
+        else:
+            chars.insert(position, rng.choice(letters))
+    return ''.join(chars)
+
+def benchmark_alignment():
+    """Check the banded aligner against the full table and time both."""
+    rng = random.Random(0)
+    pairs = load_pairs('aspell.txt')
+    # Synthetic typos from zero up to many edits exercise the full-table fallback
+    pairs += [(c, mutate(c, rng, rng.randint(0, 8))) for c, _ in pairs for _ in range(20)]
+
+    banded = BandedAligner()
+    expected = [align_full(c, m) for c, m in pairs]
+
+    print("="*60)
+    print("ALIGNMENT CHECK")
+    print("="*60)
+    single_ok = all(banded.align(c, m) == e for (c, m), e in zip(pairs, expected))
+    batch_ok = banded.align_many(pairs) == expected
+    print(f"pairs checked: {len(pairs)}")
+    print(f"banded identical to full table: {single_ok}")
+    print(f"batched identical to full table: {batch_ok}")
+    if not (single_ok and batch_ok):
+        print("FAILED: the banded aligner disagrees with the full table")
+        sys.exit(1)
+
+    print("\n" + "="*60)
+    print("ALIGNMENT BENCHMARK (microseconds per pair)")
+    print("="*60)
+    timings = {}
+    for name, run in [
+        ("full table", lambda: [align_full(c, m) for c, m in pairs]),
+        ("banded", lambda: [banded.align(c, m) for c, m in pairs]),
+        ("banded batch", lambda: banded.align_many(pairs)),
+    ]:
+        start = time.perf_counter()
+        run()
+        timings[name] = (time.perf_counter() - start) / len(pairs) * 1e6
+        print(f"{name:>14} {timings[name]:>10.2f} {timings['full table']/timings[name]:>7.2f}x")
+
+if __name__ == "__main__":
+    benchmark_alignment()
@@ -0,0 +1,264 @@
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from hidden_markov import SpellingFixerHMM
+from hmm_engine import CompiledHMM
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# HMM_PROFILE=cprofile writes a .prof file per stage next to the results;
+# HMM_PROFILE=tracemalloc records peak allocations and top sites per stage.
+PROFILE_MODE = os.environ.get('HMM_PROFILE', '').lower()
+
+class StageRecorder:
+    """Time named stages, wrapping them in the profiler chosen by HMM_PROFILE."""
+
+    def __init__(self, profile_prefix):
+        self.profile_prefix = profile_prefix
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name, profile=True):
+        """Time a block; profile=False for stages enclosing other stages."""
+        entry = self.stages.setdefault(name, {})
+        mode = PROFILE_MODE if profile else ''
+        profiler = cProfile.Profile() if mode == 'cprofile' else None
+        if mode == 'tracemalloc':
+            tracemalloc.start()
+        if profiler:
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry['seconds'] = time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+                path = f"{self.profile_prefix}.{name}.prof"
+                profiler.dump_stats(path)
+                entry['profile'] = path
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(10)
+                print(out.getvalue(), file=sys.stderr)
+            if mode == 'tracemalloc':
+                snapshot = tracemalloc.take_snapshot()
+                entry['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+                entry['top_allocations'] = [
+                    {'site': str(stat.traceback[0]), 'kb': stat.size / 1024}
+                    for stat in snapshot.statistics('lineno')[:10]]
+
+def peak_rss_mb():
+    """Peak resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (2**20 if sys.platform == 'darwin' else 2**10)
+
+def build_model(recorder, aspell_file):
+    """Build a model stage by stage, timing each step of the constructor."""
+    with recorder.stage('build_total', profile=False):
+        fixer = SpellingFixerHMM.__new__(SpellingFixerHMM)
+        fixer._init_tables()
+        fixer.source_hash = None
+
+        with recorder.stage('load_aspell_data'):
+            fixer._load_aspell_data(aspell_file)
+
+        # Aligning alone, so its share of the counting stage is visible
+        with recorder.stage('edit_distance_align') as entry:
+            for correct_word, misspelled_word in fixer.word_pairs:
+                SpellingFixerHMM._edit_distance_align(correct_word, misspelled_word)
+            entry['pairs'] = len(fixer.word_pairs)
+
+        with recorder.stage('build_character_hmm'):
+            fixer._build_character_hmm()
+
+        with recorder.stage('compile_engine'):
+            fixer.engine = CompiledHMM.from_tables(fixer.tables)
+    return fixer
+
+def add_typo(rng, word, alphabet):
+    """Apply one random substitution, insertion, deletion or swap."""
+    if len(word) < 2:
+        return word
+    i = rng.randrange(len(word))
+    edit = rng.randrange(4)
+    if edit == 0:
+        return word[:i] + rng.choice(alphabet) + word[i + 1:]
+    if edit == 1:
+        return word[:i] + rng.choice(alphabet) + word[i:]
+    if edit == 2:
+        return word[:i] + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def synthetic_corpus(fixer, rng, n_sentences, words_per_sentence=12):
+    """Sentences mixing known misspellings, clean words and fresh typos."""
+    known = sorted(fixer.word_corrections)
+    vocabulary = sorted(set(fixer.word_corrections.values()))
+    alphabet = sorted(c for c in fixer.observations if c.isalpha())
+    sentences = []
+    for _ in range(n_sentences):
+        words = []
+        for _ in range(words_per_sentence):
+            kind = rng.random()
+            if kind < 0.3:
+                words.append(rng.choice(known))
+            elif kind < 0.7:
+                words.append(rng.choice(vocabulary))
+            else:
+                words.append(add_typo(rng, rng.choice(vocabulary), alphabet))
+        sentences.append(' '.join(words))
+    return sentences
+
+def bench_viterbi(recorder, fixer, rng, lengths, words_per_length, repeats):
+    """Per-word viterbi_decode latency for each word length."""
+    alphabet = sorted(fixer.observations)
+    results = {}
+    with recorder.stage('viterbi_decode'):
+        for length in lengths:
+            words = [''.join(rng.choice(alphabet) for _ in range(length))
+                     for _ in range(words_per_length)]
+            samples = []
+            for _ in range(repeats):
+                for word in words:
+                    start = time.perf_counter()
+                    fixer.viterbi_decode(word)
+                    samples.append(time.perf_counter() - start)
+            samples.sort()
+            results[str(length)] = {
+                'mean_us': 1e6 * statistics.fmean(samples),
+                'p50_us': 1e6 * samples[len(samples) // 2],
+                'p95_us': 1e6 * samples[int(0.95 * (len(samples) - 1))],
+            }
+    return results
+
+def bench_correct_text(recorder, fixer, corpus):
+    """correct_text throughput over a synthetic corpus, with a cold cache."""
+    fixer.decode_cache.clear()
+    n_words = sum(len(sentence.split()) for sentence in corpus)
+    with recorder.stage('correct_text') as entry:
+        for sentence in corpus:
+            fixer.correct_text(sentence)
+    entry['sentences'] = len(corpus)
+    entry['words'] = n_words
+    return {
+        'sentences_per_second': len(corpus) / entry['seconds'],
+        'words_per_second': n_words / entry['seconds'],
+        'cache': fixer.cache_stats(),
+    }
+
+def compare(results, baseline, tolerance):
+    """Print timing changes against a previous run; return the regressed metrics."""
+    regressions = []
+
+    def check(name, new, old, higher_is_better=False):
+        if not old or new is None:
+            return
+        ratio = new / old
+        worse = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+        flag = '  REGRESSION' if worse else ''
+        print(f"  {name:<40} {old:>12.4f} -> {new:>12.4f} ({ratio:>5.2f}x){flag}")
+        if worse:
+            regressions.append(name)
+
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+    if baseline.get('environment', {}).get('profile_mode') != results['environment']['profile_mode']:
+        print("  warning: profiling mode differs from the baseline, timings are not comparable")
+    for name, entry in results['stages'].items():
+        old = baseline.get('stages', {}).get(name, {}).get('seconds')
+        check(f"stage {name} (s)", entry['seconds'], old)
+    for length, entry in results['viterbi'].items():
+        old = baseline.get('viterbi', {}).get(length, {}).get('p50_us')
+        check(f"viterbi len={length} p50 (us)", entry['p50_us'], old)
+    check("correct_text words/s", results['correct_text']['words_per_second'],
+          baseline.get('correct_text', {}).get('words_per_second'), higher_is_better=True)
+    check("peak RSS (MB)", results['peak_rss_mb'], baseline.get('peak_rss_mb'))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model building and decoding.")
+    parser.add_argument('--aspell', default='aspell.txt', help="training file")
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help="JSON results file")
+    parser.add_argument('--baseline', help="results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="relative slowdown reported as a regression")
+    parser.add_argument('--lengths', type=int, nargs='+', default=[2, 4, 6, 8, 10, 12, 16, 20])
+    parser.add_argument('--words-per-length', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--sentences', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    recorder = StageRecorder(os.path.splitext(args.output)[0])
+
+    print("Building model...", file=sys.stderr)
+    fixer = build_model(recorder, args.aspell)
+    print("Timing viterbi_decode...", file=sys.stderr)
+    viterbi = bench_viterbi(recorder, fixer, rng, args.lengths, args.words_per_length, args.repeats)
+    print("Timing correct_text...", file=sys.stderr)
+    correct_text = bench_correct_text(recorder, fixer, synthetic_corpus(fixer, rng, args.sentences))
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'profile_mode': PROFILE_MODE or None,
+        },
+        'config': vars(args),
+        'stages': recorder.stages,
+        'viterbi': viterbi,
+        'correct_text': correct_text,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    print("\n" + "="*60)
+    print("STAGE TIMINGS (seconds)")
+    print("="*60)
+    for name, entry in recorder.stages.items():
+        print(f"  {name:<24} {entry['seconds']:>10.4f}")
+    print("\n" + "="*60)
+    print("VITERBI LATENCY (microseconds per word)")
+    print("="*60)
+    print(f"  {'length':>6} {'mean':>10} {'p50':>10} {'p95':>10}")
+    for length, entry in viterbi.items():
+        print(f"  {length:>6} {entry['mean_us']:>10.1f} {entry['p50_us']:>10.1f} {entry['p95_us']:>10.1f}")
+    print(f"\ncorrect_text: {correct_text['words_per_second']:.0f} words/s, "
+          f"{correct_text['sentences_per_second']:.1f} sentences/s")
+    if results['peak_rss_mb'] is not None:
+        print(f"Peak RSS: {results['peak_rss_mb']:.1f} MB")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import random
+import time
+
+from hidden_markov import SpellingFixerHMM
+from sparse_transitions import SparseViterbi
+
+def time_decoder(decode, words, repeats):
+    """Return the average seconds per word for a decoder."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for word in words:
+            decode(word)
+    return (time.perf_counter() - start) / (repeats * len(words))
+
+def benchmark_viterbi():
+    """Compare the vectorized engine with the pure-Python Viterbi loop."""
+    print("Loading HMM spelling fixer...")
+    fixer = SpellingFixerHMM('aspell.txt')
+
+    rng = random.Random(0)
+    alphabet = sorted(fixer.observations)
+
+    print("\n" + "="*60)
+    print("VITERBI BENCHMARK (seconds per word)")
+    print("="*60)
+    print(f"{'length':>6} {'reference':>12} {'engine':>12} {'speedup':>9} {'match':>6}")
+
+    for length in (2, 4, 6, 8, 10, 12, 16, 20):
+        words = [''.join(rng.choice(alphabet) for _ in range(length)) for _ in range(20)]
+
+        # Outputs must be identical before timings mean anything
+        match = all(fixer._viterbi_decode_reference(w) == fixer.viterbi_decode(w) for w in words)
+
+        reference = time_decoder(fixer._viterbi_decode_reference, words, 1)
+        engine = time_decoder(fixer.viterbi_decode, words, 5)
+        print(f"{length:>6} {reference:>12.6f} {engine:>12.6f} {reference/engine:>8.1f}x {str(match):>6}")
+
+    print("\n" + "="*60)
+    print("BATCH DECODING (seconds per word)")
+    print("="*60)
+
+    words = [''.join(rng.choice(alphabet) for _ in range(rng.randint(3, 12))) for _ in range(2000)]
+    single = time_decoder(fixer.viterbi_decode, words, 1)
+    start = time.perf_counter()
+    batched = fixer.decode_many(words)
+    batch = (time.perf_counter() - start) / len(words)
+    match = batched == [fixer.viterbi_decode(w) for w in words]
+    print(f"{'single':>10} {single:>12.6f}")
+    print(f"{'batched':>10} {batch:>12.6f} {single/batch:>8.1f}x match={match}")
+
+    print("\n" + "="*60)
+    print("SPARSE TRANSITIONS (seconds per word)")
+    print("="*60)
+
+    sparse = SparseViterbi()
+    match = all(sparse.decode(fixer.engine, w) == fixer.engine.decode(w) for w in words)
+    sparse_time = time_decoder(lambda w: sparse.decode(fixer.engine, w), words, 1)
+    N = len(fixer.states)
+    print(f"observed transitions: {sparse.nnz} of {N * N}")
+    print(f"{'dense':>10} {single:>12.6f}")
+    print(f"{'sparse':>10} {sparse_time:>12.6f} {single/sparse_time:>8.1f}x match={match}")
+
+if __name__ == "__main__":
+    benchmark_viterbi()
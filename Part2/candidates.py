@@ -0,0 +1,68 @@
+from aligner import edit_distance
+
+
+class SymSpellIndex:
+    """Symmetric-delete index returning known words within an edit distance.
+
+    Every word is stored under each string obtainable by deleting up to
+    max_distance characters. A query generates its own deletes and looks
+    them up, so no distance is computed against words that cannot match.
+
+    A query of n letters is matched within at most n // letters_per_edit
+    edits, capped at max_distance. Short words sit within two edits of a
+    great many others (in -> at, fox -> fax), so they only match closely.
+    """
+
+    def __init__(self, words=(), max_distance=2, letters_per_edit=4):
+        self.max_distance = max_distance
+        self.letters_per_edit = letters_per_edit
+        self.deletes = {}
+        self.words = set()
+        for word in words:
+            self.add(word)
+
+    def _delete_variants(self, word, max_distance=None):
+        variants = {word}
+        frontier = {word}
+        for _ in range(self.max_distance if max_distance is None else max_distance):
+            frontier = {w[:i] + w[i+1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+        return variants
+
+    def add(self, word):
+        """Index one correct word."""
+        if not word or word in self.words:
+            return
+        self.words.add(word)
+        for key in self._delete_variants(word):
+            self.deletes.setdefault(key, []).append(word)
+
+    def lookup(self, word):
+        """Return [(candidate, distance)] sorted by distance, then word."""
+        max_distance = min(self.max_distance, len(word) // self.letters_per_edit)
+        seen = set()
+        candidates = []
+        for key in self._delete_variants(word, max_distance):
+            for candidate in self.deletes.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(word, candidate, max_distance)
+                if distance <= max_distance:
+                    candidates.append((candidate, distance))
+        candidates.sort(key=lambda c: (c[1], c[0]))
+        return candidates
+
+    def to_dict(self):
+        """Return a JSON-serializable form of the index."""
+        return {'max_distance': self.max_distance, 'letters_per_edit': self.letters_per_edit,
+                'deletes': self.deletes}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an index saved with to_dict without regenerating deletes."""
+        index = cls(max_distance=data['max_distance'],
+                    letters_per_edit=data.get('letters_per_edit', 4))
+        index.deletes = data['deletes']
+        index.words = {w for words in index.deletes.values() for w in words}
+        return index
@@ -0,0 +1,110 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from itertools import islice
+
+from hidden_markov import SpellingFixerHMM, iter_training_lines
+
+# The model used inside each worker process
+_worker_fixer = None
+
+def _init_worker(model_path):
+    """Map the compiled model once per worker; forked workers already share the parent's copy."""
+    global _worker_fixer
+    if _worker_fixer is None:
+        # The parent already rebuilt the file if it was stale
+        _worker_fixer = SpellingFixerHMM.load(model_path)
+
+def _correct_chunk(lines):
+    """Correct one chunk of lines, keeping everything but the words unchanged."""
+    return _worker_fixer.correct_batch_preserving(lines)
+
+def iter_chunks(lines, chunk_lines):
+    """Group an iterator of lines into lists of chunk_lines lines."""
+    while True:
+        chunk = list(islice(lines, chunk_lines))
+        if not chunk:
+            return
+        yield chunk
+
+def correct_stream(lines, output, workers, chunk_lines, model_path, aspell_file):
+    """Correct lines in parallel and write them to output in their original order.
+
+    At most a few chunks per worker are in flight, so memory stays bounded
+    no matter how large the input is. Returns the number of words seen.
+    """
+    global _worker_fixer
+    chunks = iter_chunks(lines, chunk_lines)
+    total_tokens = 0
+
+    # Train or check the model once here, never once per worker
+    if model_path is None:
+        _worker_fixer = SpellingFixerHMM(aspell_file)
+    else:
+        _worker_fixer = SpellingFixerHMM.load(model_path, aspell_file)
+
+    if workers <= 1:
+        for chunk in chunks:
+            corrected, tokens = _correct_chunk(chunk)
+            output.writelines(corrected)
+            total_tokens += tokens
+        return total_tokens
+
+    context = multiprocessing.get_context()
+    temp_dir = None
+    if model_path is None and context.get_start_method() != 'fork':
+        # Workers that do not inherit the trained model map a saved copy of it
+        temp_dir = tempfile.mkdtemp()
+        model_path = os.path.join(temp_dir, 'model.hmm')
+        _worker_fixer.save(model_path)
+
+    try:
+        with context.Pool(workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_correct_chunk, (chunk,)))
+                while len(pending) >= workers * 4:
+                    corrected, tokens = pending.popleft().get()
+                    output.writelines(corrected)
+                    total_tokens += tokens
+            while pending:
+                corrected, tokens = pending.popleft().get()
+                output.writelines(corrected)
+                total_tokens += tokens
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return total_tokens
+
+def main():
+    parser = argparse.ArgumentParser(description="Correct spelling in large text files.")
+    parser.add_argument('inputs', nargs='*', default=['-'],
+                        help="text files, .gz files, or '-' for stdin (default)")
+    parser.add_argument('-o', '--output', help="output file (default stdout)")
+    parser.add_argument('--aspell', default='aspell.txt', help="training file")
+    parser.add_argument('--model', help="compiled model path, rebuilt if the training file changed")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--chunk-lines', type=int, default=2000)
+    args = parser.parse_args()
+
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        tokens = correct_stream(iter_training_lines(args.inputs, newline=''), output, args.workers,
+                                args.chunk_lines, args.model, args.aspell)
+    finally:
+        if args.output:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Corrected {tokens} words in {elapsed:.2f}s ({tokens / elapsed:.0f} words/s)",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import re
+import subprocess
+import sys
+
+# Lines whose punctuation, numbers, acronyms and contractions must survive
+LINES = [
+    "it's what we're told, isn't it? I'll go\n",
+    "We’ll see; they’d said 'tis fine.\n",
+    "ERROR: NASA user_id=12345 at 10:32\r\n",
+    "teh quick brown fox -- helo wrld!\n",
+    "\n",
+    "  tabs\tand   spaces  \n",
+]
+
+# Everything but runs of letters must come back byte for byte
+SEPARATORS = re.compile(r"[^\W\d_]+")
+KEPT = re.compile(r"\S*['’]\S*|\b[A-Z]{2,}\b|\S*[\d_]\S*")
+
+def correct_file_test():
+    """Run correct_file.py on awkward lines and check only misspelled words change; exits 1 if not."""
+    text = ''.join(LINES)
+    failures = 0
+    for workers in (1, 2):
+        result = subprocess.run([sys.executable, 'correct_file.py', '--workers', str(workers),
+                                 '--chunk-lines', '2'],
+                                input=text.encode('utf-8'), capture_output=True)
+        output = result.stdout.decode('utf-8')
+        print(f"--workers {workers}:")
+        print(output, end='')
+
+        if result.returncode != 0:
+            print(f"FAILED: exit status {result.returncode}")
+            failures += 1
+            continue
+        if SEPARATORS.split(output) != SEPARATORS.split(text):
+            print("FAILED: punctuation, numbers or whitespace changed")
+            failures += 1
+        if KEPT.findall(output) != KEPT.findall(text):
+            print("FAILED: a contraction, acronym or identifier was rewritten")
+            failures += 1
+        if "the quick brown" not in output:
+            print("FAILED: 'teh' was not corrected")
+            failures += 1
+
+    if failures:
+        sys.exit(1)
+    print("\nOnly words were corrected.")
+
+if __name__ == "__main__":
+    correct_file_test()
@@ -1,23 +1,195 @@
+import gzip
 import math
+import sys
+import threading
+import time
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
 import re
 
+import numpy as np
+
+import aligner
+from candidates import SymSpellIndex
+from decode_cache import DecodeCache
+from lexicon import LexiconTrie
+from metrics import Metrics, to_prometheus
+from model_tables import HMMTables, ProbabilityTable, ProbabilityVector
+from pair_hmm import PairHMM
+from sparse_transitions import SparseViterbi
+import model_store
+from hmm_engine import CompiledHMM
+
+# Words for in-place correction: runs of letters not touching a digit or
+# underscore, so numbers, identifiers and times are left alone. Contractions
+# match as one word, so their pieces are never decoded on their own
+WORD_PATTERN = re.compile(r"(?<!\w)[^\W\d_]+(?:['\u2019][^\W\d_]+)*(?!\w)")
+
+def _keep_as_typed(word):
+    """Acronyms and contractions are left alone; the HMM has no state for an apostrophe."""
+    return (len(word) > 1 and word.isupper()) or "'" in word or '\u2019' in word
+
+class HMMCounts:
+    """Raw count tables for the character HMM, mergeable across shards."""
+    
+    def __init__(self):
+        self.emission_counts = defaultdict(Counter)
+        self.state_counts = Counter()
+        self.transition_counts = defaultdict(Counter)
+        self.start_counts = Counter()
+        self.end_counts = Counter()
+        # Gap alignments, used only by the pair HMM
+        self.deletion_counts = Counter()
+        self.insertion_counts = Counter()
+        self.total_words = 0
+        # Dicts used as ordered sets of the symbols seen
+        self.states = {}
+        self.observations = {}
+    
+    def add_pair(self, correct_word, misspelled_word):
+        """Align one (correct, misspelled) pair and add it to the counts."""
+        if not correct_word:
+            return
+        
+        # Use edit distance to find the best alignment
+        aligned_pairs = SpellingFixerHMM._edit_distance_align(correct_word, misspelled_word)
+        self.add_alignment(correct_word, aligned_pairs)
+    
+    def add_alignment(self, correct_word, aligned_pairs):
+        """Add an already aligned pair to the counts."""
+        if not correct_word:
+            return
+        
+        self.total_words += 1
+        
+        # Extract character mappings from alignment
+        for correct_char, typed_char in aligned_pairs:
+            if correct_char and typed_char:  # Skip gaps
+                self.states[correct_char] = None
+                self.observations[typed_char] = None
+                self.emission_counts[correct_char][typed_char] += 1
+                self.state_counts[correct_char] += 1
+            elif correct_char:
+                self.deletion_counts[correct_char] += 1
+            else:
+                self.insertion_counts[typed_char] += 1
+        
+        # Start state transitions
+        self.start_counts[correct_word[0]] += 1
+        self.states[correct_word[0]] = None
+        
+        # State-to-state transitions
+        for current_char, next_char in zip(correct_word, correct_word[1:]):
+            self.transition_counts[current_char][next_char] += 1
+            self.states[next_char] = None
+        
+        # End state transitions
+        self.end_counts[correct_word[-1]] += 1
+    
+    def merge(self, other):
+        """Add the counts of another shard into this one."""
+        for correct_char, row in other.emission_counts.items():
+            self.emission_counts[correct_char].update(row)
+        for current_char, row in other.transition_counts.items():
+            self.transition_counts[current_char].update(row)
+        self.state_counts.update(other.state_counts)
+        self.start_counts.update(other.start_counts)
+        self.end_counts.update(other.end_counts)
+        self.deletion_counts.update(other.deletion_counts)
+        self.insertion_counts.update(other.insertion_counts)
+        self.total_words += other.total_words
+        self.states.update(other.states)
+        self.observations.update(other.observations)
+
+def iter_training_lines(sources, newline=None):
+    """Yield lines one at a time from text files, .gz files or '-' for stdin.
+    
+    newline is passed to open(); '' keeps line endings untranslated.
+    """
+    for source in sources:
+        if source == '-':
+            yield from sys.stdin
+        elif source.endswith('.gz'):
+            with gzip.open(source, 'rt', encoding='utf-8', newline=newline) as f:
+                yield from f
+        else:
+            with open(source, 'r', encoding='utf-8', newline=newline) as f:
+                yield from f
+
+def _count_word_pairs(word_pairs):
+    """Count one shard of word pairs; module-level so a process pool can run it."""
+    counts = HMMCounts()
+    word_pairs = [pair for pair in word_pairs if pair[0]]
+    alignments = aligner.BandedAligner().align_many(word_pairs)
+    for (correct_word, _), aligned_pairs in zip(word_pairs, alignments):
+        counts.add_alignment(correct_word, aligned_pairs)
+    return counts
+
 class SpellingFixerHMM:
-    def __init__(self, aspell_file):
-        self.word_corrections = {}
-        self.word_frequencies = defaultdict(int)
-        self.emission_probs = defaultdict(lambda: defaultdict(float))
-        self.transition_probs = defaultdict(lambda: defaultdict(float))
-        self.start_probs = defaultdict(float)
-        self.end_probs = defaultdict(float)
-        self.states = set()
-        self.observations = set()
+    smoothing = 0.01
+    
+    def __init__(self, aspell_file, workers=None, cache_size=10000):
+        self._init_tables(cache_size)
+        start = time.perf_counter()
+        self.source_hash = model_store.file_sha256(aspell_file)
         
         # Load aspell data
         self._load_aspell_data(aspell_file)
+        start = self._record_stage('load_aspell_data', start)
         
         # Build character-level HMM from word pairs
-        self._build_character_hmm()
+        self._build_character_hmm(workers)
+        start = self._record_stage('build_character_hmm', start)
+        
+        # Precompute dense log-probability matrices for decoding
+        self.engine = CompiledHMM.from_tables(self.tables)
+        self._record_stage('compile_engine', start)
+    
+    def _init_tables(self, cache_size=10000):
+        """Create the empty lookup and probability tables."""
+        self.word_corrections = {}
+        self.word_frequencies = defaultdict(int)
+        self.tables = HMMTables((), (), np.empty(0), np.empty(0), np.empty((0, 0)), np.empty((0, 0)))
+        self.counts = HMMCounts()
+        self._update_lock = threading.Lock()
+        # Beam settings; both None means exact Viterbi
+        self.beam_width = None
+        self.beam_threshold = None
+        # Optional LexiconTrie; when set, decoding only produces known words
+        self.lexicon = None
+        # Optional SymSpellIndex consulted before falling back to Viterbi
+        self.candidate_index = None
+        # Optional PairHMM; when set, decoding may insert or drop letters
+        self.pair_hmm = None
+        # Optional SparseViterbi; when set, exact decoding runs in O(nnz + N) per step
+        self.sparse_viterbi = None
+        # Viterbi corrections with a lower posterior P(correction | word) are skipped
+        self.min_confidence = None
+        # Decoded unknown words; keys carry the model generation so entries
+        # from before an update() can never be served afterwards
+        self.decode_cache = DecodeCache(cache_size)
+        self._generation = 0
+        # Runtime Metrics, None while disabled so the hot path pays one check
+        self.recorder = None
+        # Seconds spent in each training stage, recorded unconditionally
+        self.training_seconds = {}
+    
+    def _record_stage(self, stage, start):
+        """Add the time since start to a training stage; returns the current time."""
+        now = time.perf_counter()
+        self.training_seconds[stage] = self.training_seconds.get(stage, 0.0) + now - start
+        return now
+    
+    @staticmethod
+    def _parse_aspell_line(line):
+        """Split an aspell line into (correct_word, misspellings), or None."""
+        line = line.strip()
+        if ':' not in line:
+            return None
+        correct_word, misspellings = line.split(':', 1)
+        correct_word = correct_word.strip().lower()
+        misspellings = [m.strip().lower() for m in misspellings.split()]
+        return correct_word, misspellings
     
     def _load_aspell_data(self, aspell_file):
         """Load the aspell data and create word mappings."""
@@ -25,11 +197,9 @@ class SpellingFixerHMM:
         
         with open(aspell_file, 'r', encoding='utf-8') as f:
             for line in f:
-                line = line.strip()
-                if ':' in line:
-                    correct_word, misspellings = line.split(':', 1)
-                    correct_word = correct_word.strip().lower()
-                    misspellings = [m.strip().lower() for m in misspellings.split()]
+                parsed = self._parse_aspell_line(line)
+                if parsed:
+                    correct_word, misspellings = parsed
                     
                     # Count frequency of correct word
                     self.word_frequencies[correct_word] += 1
@@ -38,143 +208,187 @@ class SpellingFixerHMM:
                     for misspelling in misspellings:
                         self.word_corrections[misspelling] = correct_word
                         self.word_pairs.append((correct_word, misspelling))
+        
+        self.num_word_pairs = len(self.word_pairs)
     
-    def _build_character_hmm(self):
-        """Build character-level HMM from word pairs using edit distance alignment."""
-        emission_counts = defaultdict(lambda: defaultdict(int))
-        state_counts = defaultdict(int)
-        transition_counts = defaultdict(lambda: defaultdict(int))
-        start_counts = defaultdict(int)
-        end_counts = defaultdict(int)
-        total_words = 0
-        
-        for correct_word, misspelled_word in self.word_pairs:
-            if not correct_word:
+    @classmethod
+    def train_streaming(cls, sources, keep_corrections=True):
+        """Train from files, .gz files or '-' (stdin) one line at a time.
+        
+        Only the alphabet-sized count tables are held while reading. With
+        keep_corrections=False the word lookup tables are skipped too, so
+        memory no longer grows with the number of distinct words.
+        """
+        start = time.perf_counter()
+        fixer = cls.__new__(cls)
+        fixer._init_tables()
+        fixer.source_hash = None
+        fixer.word_pairs = []
+        fixer.num_word_pairs = 0
+        counts = HMMCounts()
+        
+        for line in iter_training_lines(sources):
+            parsed = cls._parse_aspell_line(line)
+            if not parsed:
                 continue
-                
-            total_words += 1
+            correct_word, misspellings = parsed
             
-            # Use edit distance to find the best alignment
-            aligned_pairs = self._edit_distance_align(correct_word, misspelled_word)
-            
-            # Extract character mappings from alignment
-            for correct_char, typed_char in aligned_pairs:
-                if correct_char and typed_char:  # Skip gaps
-                    self.states.add(correct_char)
-                    self.observations.add(typed_char)
-                    emission_counts[correct_char][typed_char] += 1
-                    state_counts[correct_char] += 1
+            if keep_corrections:
+                fixer.word_frequencies[correct_word] += 1
+            for misspelling in misspellings:
+                if keep_corrections:
+                    fixer.word_corrections[misspelling] = correct_word
+                counts.add_pair(correct_word, misspelling)
+                fixer.num_word_pairs += 1
+        start = fixer._record_stage('count_streaming', start)
+        
+        fixer._normalize_counts(counts)
+        fixer.engine = CompiledHMM.from_tables(fixer.tables)
+        fixer._record_stage('compile_engine', start)
+        return fixer
+    
+    def _build_character_hmm(self, workers=None):
+        """Build character-level HMM from word pairs using edit distance alignment."""
+        if workers and workers > 1 and len(self.word_pairs) > 1:
+            # Several shards per worker keeps the pool busy when shards run unevenly
+            shard_size = -(-len(self.word_pairs) // (workers * 4))
+            shards = [self.word_pairs[i:i + shard_size]
+                      for i in range(0, len(self.word_pairs), shard_size)]
+            counts = HMMCounts()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for shard_counts in pool.map(_count_word_pairs, shards):
+                    counts.merge(shard_counts)
+        else:
+            counts = _count_word_pairs(self.word_pairs)
+        
+        self._normalize_counts(counts)
+    
+    def _normalize_counts(self, counts):
+        """Turn merged count tables into smoothed probability tables."""
+        # Raw counts are kept so update() can fold in new pairs later
+        self.counts = counts
+        self.tables = HMMTables.from_counts(counts, self.smoothing)
+    
+    # Dict views over the integer-indexed tables, for code written against
+    # the original nested defaultdicts
+    
+    @property
+    def states(self):
+        return self.tables.state_index.keys()
+    
+    @property
+    def observations(self):
+        return self.tables.obs_index.keys()
+    
+    @property
+    def emission_probs(self):
+        tables = self.tables
+        return ProbabilityTable(tables.state_index, tables.obs_index, tables.emission)
+    
+    @property
+    def transition_probs(self):
+        tables = self.tables
+        return ProbabilityTable(tables.state_index, tables.state_index, tables.transition)
+    
+    @property
+    def start_probs(self):
+        return ProbabilityVector(self.tables.state_index, self.tables.start)
+    
+    @property
+    def end_probs(self):
+        return ProbabilityVector(self.tables.state_index, self.tables.end)
+    
+    def update(self, pairs):
+        """Fold new (correct, typo) pairs into the model without retraining.
+        
+        Only the emission and transition rows the pairs touch are
+        renormalized, unless they bring a new character, which changes
+        every smoothing denominator. The decoder is rebuilt on the side
+        and swapped in with one assignment, so concurrent correct_text
+        callers keep using the old engine until the new one is ready.
+        """
+        start = time.perf_counter()
+        pairs = [(c.strip().lower(), m.strip().lower()) for c, m in pairs]
+        delta = _count_word_pairs(pairs)
+        
+        with self._update_lock:
+            for correct_word, misspelling in pairs:
+                self.word_frequencies[correct_word] += 1
+                self.word_corrections[misspelling] = correct_word
+                if self.lexicon is not None:
+                    self.lexicon.add(correct_word)
+                if self.candidate_index is not None:
+                    self.candidate_index.add(correct_word)
+            self.num_word_pairs += len(pairs)
             
-            # Build transition probabilities from correct words
-            word_chars = list(correct_word)
+            has_new_symbols = (any(c not in self.states for c in delta.states)
+                               or any(c not in self.observations for c in delta.observations))
+            self.counts.merge(delta)
             
-            # Start state transitions
-            if word_chars:
-                start_counts[word_chars[0]] += 1
-                self.states.add(word_chars[0])
+            if has_new_symbols:
+                self._normalize_counts(self.counts)
+                self.engine = CompiledHMM.from_tables(self.tables)
+            else:
+                # Copy-on-write, so readers always see one consistent table set
+                tables = self.tables.copy()
+                for char in delta.state_counts:
+                    tables.fill_emission_row(self.counts, char, self.smoothing)
+                for char in delta.transition_counts:
+                    tables.fill_transition_row(self.counts, char, self.smoothing)
+                tables.fill_start_end(self.counts, self.smoothing)
+                self.tables = tables
+                
+                self.engine = self.engine.with_updated_rows(
+                    tables, delta.state_counts, delta.transition_counts)
             
-            # State-to-state transitions
-            for i in range(len(word_chars) - 1):
-                current_char = word_chars[i]
-                next_char = word_chars[i + 1]
-                transition_counts[current_char][next_char] += 1
-                self.states.add(next_char)
+            if self.pair_hmm is not None:
+                self.pair_hmm = PairHMM(self.engine, self.counts, self.word_frequencies,
+                                        self.smoothing, self.pair_hmm.band)
             
-            # End state transitions
-            if word_chars:
-                end_counts[word_chars[-1]] += 1
-        
-        # Calculate emission probabilities with smoothing
-        smoothing = 0.01
-        for correct_char in self.states:
-            total_count = state_counts[correct_char]
-            for typed_char in self.observations:
-                count = emission_counts[correct_char][typed_char]
-                prob = (count + smoothing) / (total_count + smoothing * len(self.observations))
-                self.emission_probs[correct_char][typed_char] = prob
-        
-        # Calculate transition probabilities
-        for current_char in self.states:
-            total_transitions = sum(transition_counts[current_char].values())
-            if total_transitions > 0:
-                for next_char in self.states:
-                    count = transition_counts[current_char][next_char]
-                    self.transition_probs[current_char][next_char] = (count + smoothing) / (total_transitions + smoothing * len(self.states))
-            else:
-                for next_char in self.states:
-                    self.transition_probs[current_char][next_char] = 1.0 / len(self.states)
-        
-        # Calculate start and end probabilities
-        for char in self.states:
-            self.start_probs[char] = (start_counts[char] + smoothing) / (total_words + smoothing * len(self.states))
-            self.end_probs[char] = (end_counts[char] + smoothing) / (total_words + smoothing * len(self.states))
+            # Invalidate cached decodes only once the new engine is in place
+            self._generation += 1
+            self.decode_cache.clear()
+            self._record_stage('update', start)
     
-    def _edit_distance_align(self, correct_word, misspelled_word):
+    @staticmethod
+    def _edit_distance_align(correct_word, misspelled_word):
         """Use dynamic programming to find the best alignment between two words."""
-        m, n = len(correct_word), len(misspelled_word)
-        
-        # Create DP table
-        dp = [[0] * (n + 1) for _ in range(m + 1)]
-        path = [[None] * (n + 1) for _ in range(m + 1)]
-        
-        # Initialize base cases
-        for i in range(m + 1):
-            dp[i][0] = i
-            path[i][0] = 'D'  # Deletion
-        for j in range(n + 1):
-            dp[0][j] = j
-            path[0][j] = 'I'  # Insertion
-        
-        # Fill DP table
-        for i in range(1, m + 1):
-            for j in range(1, n + 1):
-                if correct_word[i-1] == misspelled_word[j-1]:
-                    dp[i][j] = dp[i-1][j-1]
-                    path[i][j] = 'M'  # Match
-                else:
-                    # Find minimum cost operation
-                    costs = [
-                        (dp[i-1][j] + 1, 'D'),      # Deletion
-                        (dp[i][j-1] + 1, 'I'),      # Insertion
-                        (dp[i-1][j-1] + 1, 'S')     # Substitution
-                    ]
-                    min_cost, operation = min(costs)
-                    dp[i][j] = min_cost
-                    path[i][j] = operation
-        
-        # Backtrack to find alignment
-        aligned = []
-        i, j = m, n
-        
-        while i > 0 and j > 0:
-            if path[i][j] == 'M':
-                aligned.append((correct_word[i-1], misspelled_word[j-1]))
-                i -= 1
-                j -= 1
-            elif path[i][j] == 'D':
-                aligned.append((correct_word[i-1], None))
-                i -= 1
-            elif path[i][j] == 'I':
-                aligned.append((None, misspelled_word[j-1]))
-                j -= 1
-            else:  # 'S' - Substitution
-                aligned.append((correct_word[i-1], misspelled_word[j-1]))
-                i -= 1
-                j -= 1
-        
-        # Handle remaining characters
-        while i > 0:
-            aligned.append((correct_word[i-1], None))
-            i -= 1
-        while j > 0:
-            aligned.append((None, misspelled_word[j-1]))
-            j -= 1
-        
-        aligned.reverse()
-        return aligned
+        return aligner.align(correct_word, misspelled_word)
     
     def viterbi_decode(self, observation_sequence):
         """Decode the observation sequence using the Viterbi algorithm."""
+        if self.lexicon is not None:
+            word = self.lexicon.decode(self.engine, observation_sequence)
+            if word is not None:
+                return word
+        if self.pair_hmm is not None:
+            word = self.pair_hmm.decode(observation_sequence)
+            if word is not None:
+                return word
+        if self.beam_width is not None or self.beam_threshold is not None:
+            return self.engine.decode_beam(observation_sequence, self.beam_width, self.beam_threshold)
+        if self.sparse_viterbi is not None:
+            return self.sparse_viterbi.decode(self.engine, observation_sequence)
+        return self.engine.decode(observation_sequence)
+    
+    def viterbi_nbest(self, observation_sequence, k=5):
+        """Return the k most likely corrections as (word, log-probability), best first.
+        
+        With a lexicon set the candidates are the best lexicon words of the
+        same length, falling back to exact list Viterbi like viterbi_decode.
+        N-best is exact, so it is not available in pair-HMM or beam mode.
+        """
+        if (self.pair_hmm is not None
+                or self.beam_width is not None or self.beam_threshold is not None):
+            raise ValueError("N-best decoding is exact; it does not support pair-HMM or beam mode")
+        if self.lexicon is not None:
+            words = self.lexicon.decode_nbest(self.engine, observation_sequence, k)
+            if words is not None:
+                return words
+        return self.engine.decode_nbest(observation_sequence, k)
+    
+    def _viterbi_decode_reference(self, observation_sequence):
+        """Pure-Python Viterbi decoder kept as the reference for the engine."""
         if not observation_sequence:
             return ""
         
@@ -249,35 +463,390 @@ class SpellingFixerHMM:
         best_path.reverse()
         return ''.join(best_path)
     
+    def set_lexicon(self, words_file=None):
+        """Restrict decoding to the known correct words plus an optional word list.
+        
+        Words of a length the lexicon does not cover still fall back to
+        unconstrained Viterbi.
+        """
+        words = list(self.word_frequencies)
+        if words_file:
+            with open(words_file, 'r', encoding='utf-8') as f:
+                words.extend(line.strip().lower() for line in f)
+        
+        self.lexicon = LexiconTrie(words)
+        self._generation += 1
+        self.decode_cache.clear()
+    
+    def set_pair_hmm(self, band=2):
+        """Correct to known words up to band letters longer or shorter than typed.
+        
+        Words with no known word close enough still go through Viterbi.
+        """
+        self.pair_hmm = PairHMM(self.engine, self.counts, self.word_frequencies, self.smoothing, band)
+        self._generation += 1
+        self.decode_cache.clear()
+    
+    def set_sparse_transitions(self, enabled=True):
+        """Decode with the transitions split into observed cells plus a smoothing background."""
+        self.sparse_viterbi = SparseViterbi() if enabled else None
+    
+    def build_candidate_index(self, max_distance=2, letters_per_edit=4):
+        """Index the known correct words for edit-distance candidate lookup.
+        
+        A typed word of n letters is only matched to words within
+        n // letters_per_edit edits, at most max_distance.
+        """
+        self.candidate_index = SymSpellIndex(self.word_frequencies, max_distance, letters_per_edit)
+        self._generation += 1
+        self.decode_cache.clear()
+    
+    def best_candidate(self, word):
+        """Return the indexed word most likely to have been typed as word, or None.
+        
+        Only the candidates needing the fewest edits are ranked, so a known
+        word one edit away is never passed over for a likelier one two
+        edits away.
+        """
+        if self.candidate_index is None:
+            return None
+        
+        candidates = self.candidate_index.lookup(word)
+        if not candidates:
+            return None
+        candidates = [c for c in candidates if c[1] == candidates[0][1]]
+        
+        scores = self.score_many([(word, candidate) for candidate, _ in candidates])
+        best_score, best_word = max(zip(scores, (c for c, _ in candidates)), key=lambda s: s[0])
+        return best_word if best_score > float('-inf') else None
+    
+    def score(self, observed, hypothesis):
+        """Return log P(hypothesis, observed) under the HMM."""
+        return self.score_many([(observed, hypothesis)])[0]
+    
+    def score_many(self, pairs):
+        """Score (observed, hypothesis) pairs in batches.
+        
+        Equal-length pairs are scored position by position, which is the
+        HMM's own generative story; other pairs are scored along their edit
+        distance alignment, with one unseen emission per gap.
+        """
+        engine = self.engine
+        scores = engine.score_paths_many(pairs)
+        for i, (observed, hypothesis) in enumerate(pairs):
+            if len(observed) != len(hypothesis):
+                scores[i] = engine.score_alignment(self._edit_distance_align(hypothesis, observed))
+        return scores
+    
+    def forward_logprob(self, observed):
+        """Return log P(observed), summed over every hidden spelling."""
+        return self.engine.forward_logprob_many([observed])[0]
+    
+    def forward_logprob_many(self, words):
+        """Batched forward_logprob."""
+        return self.engine.forward_logprob_many(words)
+    
+    def posteriors(self, observed):
+        """Return {state: [P(state at position t | observed) for each t]}."""
+        return self.posteriors_many([observed])[0]
+    
+    def posteriors_many(self, words):
+        """Batched posteriors from one forward-backward pass per length group."""
+        engine = self.engine
+        return [dict(zip(engine.states, matrix.T.tolist()))
+                for matrix in engine.posteriors_many(words)]
+    
+    def confidence(self, observed, hypothesis):
+        """Return P(hypothesis | observed), the share of probability mass on that spelling."""
+        return math.exp(self.score(observed, hypothesis) - self.forward_logprob(observed))
+    
+    def decode_many(self, words):
+        """Decode a list of observation sequences in batched Viterbi passes."""
+        if (self.lexicon is not None or self.pair_hmm is not None or self.sparse_viterbi is not None
+                or self.beam_width is not None or self.beam_threshold is not None):
+            return [self.viterbi_decode(word) for word in words]
+        return self.engine.decode_many(words)
+    
     def correct_text(self, text):
         """Correct spelling errors using both HMM and direct lookup."""
-        words = text.split()
-        corrected_words = []
-        
-        for word in words:
-            clean_word = re.sub(r'[^\w]', '', word.lower())
-            if clean_word:
-                # First try direct lookup
-                if clean_word in self.word_corrections:
-                    corrected_word = self.word_corrections[clean_word]
+        return self.correct_batch([text])[0]
+    
+    def correct_batch(self, texts):
+        """Correct many texts, decoding all of their unknown words together."""
+        tokenized = []
+        clean_words = Counter()
+        
+        for text in texts:
+            tokens = []
+            for word in text.split():
+                clean_word = re.sub(r'[^\w]', '', word.lower())
+                if clean_word:
+                    clean_words[clean_word] += 1
+                tokens.append((word, clean_word))
+            tokenized.append(tokens)
+        
+        corrections = self._correct_words(clean_words)
+        
+        results = []
+        for tokens in tokenized:
+            corrected_words = []
+            for word, clean_word in tokens:
+                if clean_word:
+                    corrected_word = corrections[clean_word]
+                    
+                    # Preserve original case
+                    if word[0].isupper():
+                        corrected_word = corrected_word.capitalize()
+                    corrected_words.append(corrected_word)
                 else:
-                    # Use HMM for unknown words
-                    corrected_word = self.viterbi_decode(clean_word)
-                
-                # Preserve original case
-                if word[0].isupper():
-                    corrected_word = corrected_word.capitalize()
-                corrected_words.append(corrected_word)
+                    corrected_words.append(word)
+            results.append(' '.join(corrected_words))
+        
+        return results
+    
+    def correct_batch_preserving(self, texts):
+        """Like correct_batch, but only words are rewritten.
+        
+        Whitespace, punctuation, numbers and line endings are kept exactly
+        as they were. Words of two or more capitals are taken for acronyms
+        and, like contractions, left unchanged. Returns (corrected_texts, number_of_words).
+        """
+        matches = [list(WORD_PATTERN.finditer(text)) for text in texts]
+        corrections = self._correct_words(
+            Counter(m.group().lower() for found in matches for m in found
+                    if not _keep_as_typed(m.group())))
+        
+        results = []
+        for text, found in zip(texts, matches):
+            pieces = []
+            end = 0
+            for match in found:
+                word = match.group()
+                if _keep_as_typed(word):
+                    corrected_word = word
+                else:
+                    corrected_word = corrections[word.lower()]
+                    if word[0].isupper():
+                        corrected_word = corrected_word.capitalize()
+                pieces.append(text[end:match.start()])
+                pieces.append(corrected_word)
+                end = match.end()
+            pieces.append(text[end:])
+            results.append(''.join(pieces))
+        
+        return results, sum(len(found) for found in matches)
+    
+    def _correct_words(self, clean_words):
+        """Map each cleaned word to its correction, decoding unknown ones together.
+        
+        clean_words maps each distinct word to its number of occurrences,
+        which only the metrics use.
+        """
+        # First try direct lookup
+        corrections = {}
+        unknown_words = []
+        for clean_word in clean_words:
+            corrected_word = self.word_corrections.get(clean_word)
+            if corrected_word is None:
+                unknown_words.append(clean_word)
+            else:
+                corrections[clean_word] = corrected_word
+        
+        # Use HMM for unknown words, each distinct word decoded once
+        cache_keys = {}
+        generation = self._generation
+        for clean_word in unknown_words:
+            key = (generation, self.beam_width, self.beam_threshold, self.min_confidence,
+                   self.lexicon is not None, self.candidate_index is not None,
+                   self.pair_hmm is not None, self.sparse_viterbi is not None, clean_word)
+            cached = self.decode_cache.get(key)
+            if cached is None:
+                cache_keys[clean_word] = key
             else:
-                corrected_words.append(word)
+                corrections[clean_word] = cached
+        
+        # Known words within a few edits are ranked first; Viterbi only
+        # runs for words with no candidate at all
+        misses = []
+        for clean_word in cache_keys:
+            corrected_word = self.best_candidate(clean_word)
+            if corrected_word is None:
+                misses.append(clean_word)
+            else:
+                corrections[clean_word] = corrected_word
+                self.decode_cache.put(cache_keys[clean_word], corrected_word)
+        
+        recorder = self.recorder
+        decoded = self.decode_many(misses) if recorder is None else self._decode_many_timed(misses)
+        if self.min_confidence is not None and misses:
+            # Keep the word as typed when the HMM is unsure of its rewrite
+            scores = self.score_many(list(zip(misses, decoded)))
+            totals = self.forward_logprob_many(misses)
+            threshold = math.log(self.min_confidence) if self.min_confidence > 0 else float('-inf')
+            confident = [s - z >= threshold for s, z in zip(scores, totals)]
+            decoded = [c if ok else w for w, c, ok in zip(misses, decoded, confident)]
+            if recorder is not None:
+                recorder.inc('low_confidence_words',
+                             sum(clean_words[w] for w, ok in zip(misses, confident) if not ok))
+        
+        if recorder is not None:
+            unknown = set(unknown_words)
+            decoded_here = set(misses)
+            paths = {
+                'lookup': [w for w in clean_words if w not in unknown],
+                'cache': [w for w in unknown_words if w not in cache_keys],
+                'candidate': [w for w in cache_keys if w not in decoded_here],
+                'viterbi': misses,
+            }
+            # Every occurrence counts under the path that corrected its word
+            for path, words in paths.items():
+                recorder.inc(f'{path}_words', sum(clean_words[w] for w in words))
+                recorder.inc(f'{path}_distinct_words', len(words))
+        
+        for clean_word, corrected_word in zip(misses, decoded):
+            corrections[clean_word] = corrected_word
+            self.decode_cache.put(cache_keys[clean_word], corrected_word)
+        
+        return corrections
+    
+    def _decode_many_timed(self, words):
+        """decode_many, one word length at a time, recording per-word latency."""
+        by_length = defaultdict(list)
+        for position, word in enumerate(words):
+            by_length[len(word)].append(position)
+        
+        decoded = [None] * len(words)
+        for length, positions in by_length.items():
+            start = time.perf_counter()
+            results = self.decode_many([words[p] for p in positions])
+            elapsed = time.perf_counter() - start
+            self.recorder.observe_decode(length, elapsed / len(positions), len(positions))
+            for position, result in zip(positions, results):
+                decoded[position] = result
+        return decoded
+    
+    def cache_stats(self):
+        """Return hit/miss/eviction counters of the decoded-word cache."""
+        return self.decode_cache.stats()
+    
+    def enable_metrics(self):
+        """Start counting how words are corrected and timing Viterbi decodes."""
+        if self.recorder is None:
+            self.recorder = Metrics()
+    
+    def disable_metrics(self):
+        """Stop recording runtime metrics and drop what was collected."""
+        self.recorder = None
+    
+    def metrics(self):
+        """Return a snapshot of runtime counters, decode latencies, cache and training timings.
+        
+        Word counters count word occurrences, split by the path that
+        corrected them: lookup (word_corrections), cache, candidate (the
+        SymSpell index) or viterbi. The *_distinct_words counters count
+        each word once per batch instead.
+        """
+        snapshot = self.recorder.snapshot() if self.recorder is not None else {}
+        snapshot['enabled'] = self.recorder is not None
+        snapshot['cache'] = self.cache_stats()
+        snapshot['training_seconds'] = dict(self.training_seconds)
+        return snapshot
+    
+    def metrics_text(self):
+        """Return metrics() in the Prometheus text exposition format."""
+        return to_prometheus(self.metrics())
+    
+    def save(self, path):
+        """Write the trained model to a compact, memory-mappable file."""
+        states = self.engine.states
+        observations = self.engine.observations
+        
+        metadata = {
+            'source_sha256': self.source_hash,
+            'states': states,
+            'observations': observations,
+            'num_word_pairs': self.num_word_pairs,
+            'total_words': self.counts.total_words,
+            # Inserted characters need not be observations, so keep them by name
+            'insertion_counts': self.counts.insertion_counts,
+            'unseen_emission': self.engine.unseen_emission,
+            'word_corrections': self.word_corrections,
+            'word_frequencies': self.word_frequencies,
+            'candidate_index': self.candidate_index.to_dict() if self.candidate_index else None,
+        }
+        arrays = {
+            'start_probs': self.tables.start,
+            'end_probs': self.tables.end,
+            'transition_probs': self.tables.transition,
+            'emission_probs': self.tables.emission,
+            'log_start': self.engine.log_start,
+            'log_trans': self.engine.log_trans,
+            'log_emit': self.engine.log_emit,
+            'log_end': self.engine.log_end,
+            # Raw counts so a loaded model can still be updated
+            'start_counts': np.array([self.counts.start_counts[s] for s in states], dtype=np.int64),
+            'end_counts': np.array([self.counts.end_counts[s] for s in states], dtype=np.int64),
+            'state_counts': np.array([self.counts.state_counts[s] for s in states], dtype=np.int64),
+            'transition_counts': np.array([[self.counts.transition_counts[p][s] for s in states]
+                                           for p in states], dtype=np.int64).reshape(len(states), len(states)),
+            'deletion_counts': np.array([self.counts.deletion_counts[s] for s in states], dtype=np.int64),
+            'emission_counts': np.array([[self.counts.emission_counts[s][o] for o in observations]
+                                         for s in states], dtype=np.int64).reshape(len(states), len(observations)),
+        }
+        model_store.write_artifact(path, metadata, arrays)
+    
+    @classmethod
+    def load(cls, path, aspell_file=None):
+        """Load a saved model, rebuilding it first if aspell_file has changed."""
+        if aspell_file is not None and not model_store.is_current(path, aspell_file):
+            fixer = cls(aspell_file)
+            fixer.save(path)
+            return fixer
+        
+        start = time.perf_counter()
+        header, arrays = model_store.read_artifact(path)
+        states = header['states']
+        observations = header['observations']
+        
+        # Skip training entirely and restore the tables from the artifact
+        fixer = cls.__new__(cls)
+        fixer._init_tables()
+        fixer.word_corrections = header['word_corrections']
+        fixer.word_frequencies.update(header['word_frequencies'])
+        fixer.tables = HMMTables(states, observations, arrays['start_probs'], arrays['end_probs'],
+                                 arrays['transition_probs'], arrays['emission_probs'])
+        fixer.source_hash = header['source_sha256']
+        fixer.word_pairs = []
+        fixer.num_word_pairs = header['num_word_pairs']
+        
+        if header['candidate_index'] is not None:
+            fixer.candidate_index = SymSpellIndex.from_dict(header['candidate_index'])
+        
+        counts = fixer.counts
+        counts.total_words = header['total_words']
+        counts.states = dict.fromkeys(states)
+        counts.observations = dict.fromkeys(observations)
+        counts.start_counts.update(dict(zip(states, arrays['start_counts'].tolist())))
+        counts.end_counts.update(dict(zip(states, arrays['end_counts'].tolist())))
+        counts.state_counts.update(dict(zip(states, arrays['state_counts'].tolist())))
+        counts.deletion_counts.update(dict(zip(states, arrays['deletion_counts'].tolist())))
+        counts.insertion_counts.update(header['insertion_counts'])
+        for state, row in zip(states, arrays['transition_counts'].tolist()):
+            counts.transition_counts[state].update({s: c for s, c in zip(states, row) if c})
+        for state, row in zip(states, arrays['emission_counts'].tolist()):
+            counts.emission_counts[state].update({o: c for o, c in zip(observations, row) if c})
         
-        return ' '.join(corrected_words)
+        fixer.engine = CompiledHMM(states, observations, arrays['log_start'],
+                                   arrays['log_trans'], arrays['log_emit'], arrays['log_end'],
+                                   header['unseen_emission'])
+        fixer._record_stage('load_artifact', start)
+        return fixer
     
     def print_statistics(self):
         """Print statistics about the trained model."""
         print(f"Number of states (correct letters): {len(self.states)}")
         print(f"Number of observations (typed letters): {len(self.observations)}")
-        print(f"Number of word pairs processed: {len(self.word_pairs)}")
+        print(f"Number of word pairs processed: {self.num_word_pairs}")
         print(f"Number of direct corrections: {len(self.word_corrections)}")
         
         print("\nTop emission probabilities (P(typed|correct)):")
@@ -0,0 +1,365 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+
+class CompiledHMM:
+    """Dense log-space matrices for a trained character HMM."""
+
+    def __init__(self, states, observations, log_start, log_trans, log_emit, log_end,
+                 unseen_emission=0.001):
+        self.states = list(states)
+        self.observations = list(observations)
+        self.state_index = {s: i for i, s in enumerate(self.states)}
+        # The extra last row of log_emit holds the emission used for unseen characters
+        self.obs_index = {o: i for i, o in enumerate(self.observations)}
+        self.unknown_obs = len(self.observations)
+
+        self.log_start = log_start
+        self.log_trans = log_trans
+        # Stored observation-major so each time step reads one contiguous row
+        self.log_emit = log_emit
+        self.log_end = log_end
+        self.unseen_emission = unseen_emission
+
+    @classmethod
+    def from_tables(cls, tables, unseen_emission=0.001):
+        """Compile the probability arrays of an HMMTables."""
+        N = len(tables.states)
+        M = len(tables.observations)
+
+        engine = cls(tables.states, tables.observations, np.empty(N), np.empty((N, N)),
+                     np.empty((M + 1, N)), np.empty(N), unseen_emission)
+        engine._fill_start_end(tables)
+        for i in range(N):
+            engine._fill_transition_row(tables, i)
+            engine._fill_emission_column(tables, i)
+        return engine
+
+    def with_updated_rows(self, tables, emission_states, transition_states):
+        """Return a copy with only the given rows and start/end recompiled."""
+        engine = CompiledHMM(self.states, self.observations, np.empty_like(self.log_start),
+                             np.array(self.log_trans), np.array(self.log_emit),
+                             np.empty_like(self.log_end), self.unseen_emission)
+        engine._fill_start_end(tables)
+        for state in transition_states:
+            engine._fill_transition_row(tables, self.state_index[state])
+        for state in emission_states:
+            engine._fill_emission_column(tables, self.state_index[state])
+        return engine
+
+    # math.log keeps every value bit-identical to the reference decoder
+
+    def _fill_start_end(self, tables):
+        self.log_start[:] = [math.log(p) for p in tables.start.tolist()]
+        self.log_end[:] = [math.log(p) for p in tables.end.tolist()]
+
+    def _fill_transition_row(self, tables, i):
+        self.log_trans[i] = [math.log(p) for p in tables.transition[i].tolist()]
+
+    def _fill_emission_column(self, tables, j):
+        self.log_emit[:-1, j] = [math.log(p) for p in tables.emission[j].tolist()]
+        self.log_emit[self.unknown_obs, j] = math.log(self.unseen_emission)
+
+    def encode(self, observation_sequence):
+        """Map a string to an array of observation column indices."""
+        return np.fromiter(
+            (self.obs_index.get(c, self.unknown_obs) for c in observation_sequence),
+            dtype=np.intp, count=len(observation_sequence))
+
+    def decode(self, observation_sequence):
+        """Viterbi decode with one vectorized max/argmax per time step."""
+        if not observation_sequence:
+            return ""
+
+        N = len(self.states)
+        if N == 0:
+            return observation_sequence
+
+        obs = self.encode(observation_sequence)
+        T = len(obs)
+        cols = np.arange(N)
+        backpointer = np.zeros((T, N), dtype=np.intp)
+
+        # Initialization step
+        viterbi = self.log_start + self.log_emit[obs[0]]
+
+        # Recursion step: scores[prev, cur] in the same summation order as the loop
+        for t in range(1, T):
+            scores = viterbi[:, None] + self.log_trans
+            scores += self.log_emit[obs[t]]
+            best_prev = scores.argmax(axis=0)
+            backpointer[t] = best_prev
+            viterbi = scores[best_prev, cols]
+
+        # Termination step
+        current_state = int((viterbi + self.log_end).argmax())
+
+        # Backtrack to find the best path
+        best_path = []
+        for t in range(T - 1, -1, -1):
+            best_path.append(self.states[current_state])
+            current_state = backpointer[t, current_state]
+
+        best_path.reverse()
+        return ''.join(best_path)
+
+    def decode_beam(self, observation_sequence, beam_width=None, threshold=None):
+        """Viterbi decode keeping only the best hypotheses at each time step.
+
+        beam_width keeps the top-K states; threshold keeps states within that
+        many log-probability units of the best one. Either or both may be set.
+        """
+        if not observation_sequence:
+            return ""
+
+        N = len(self.states)
+        if N == 0:
+            return observation_sequence
+
+        obs = self.encode(observation_sequence)
+        T = len(obs)
+        cols = np.arange(N)
+        backpointer = np.zeros((T, N), dtype=np.intp)
+
+        # Initialization step
+        viterbi = self.log_start + self.log_emit[obs[0]]
+        active = self._prune(viterbi, beam_width, threshold)
+
+        # Recursion step over surviving previous states only
+        for t in range(1, T):
+            scores = viterbi[active, None] + self.log_trans[active]
+            scores += self.log_emit[obs[t]]
+            best = scores.argmax(axis=0)
+            backpointer[t] = active[best]
+            viterbi = scores[best, cols]
+            active = self._prune(viterbi, beam_width, threshold)
+
+        # Termination step
+        final = viterbi[active] + self.log_end[active]
+        current_state = int(active[final.argmax()])
+
+        # Backtrack to find the best path
+        best_path = []
+        for t in range(T - 1, -1, -1):
+            best_path.append(self.states[current_state])
+            current_state = backpointer[t, current_state]
+
+        best_path.reverse()
+        return ''.join(best_path)
+
+    def decode_nbest(self, observation_sequence, k):
+        """Return the k best (hidden string, joint log-probability) pairs, best first.
+
+        List Viterbi: every state keeps its k best partial paths, and each
+        step merges the N * k extensions into state with one top-k selection.
+        Returns an empty list for k <= 0.
+        """
+        if k <= 0:
+            return []
+        if not observation_sequence or not self.states:
+            return [(observation_sequence, 0.0)]
+
+        N = len(self.states)
+        obs = self.encode(observation_sequence)
+        T = len(obs)
+        # backpointer[t, rank, cur] is a flat index prev * k + prev_rank
+        backpointer = np.zeros((T, k, N), dtype=np.intp)
+
+        # Initialization step: only rank 0 holds a path
+        delta = np.full((N, k), -np.inf)
+        delta[:, 0] = self.log_start + self.log_emit[obs[0]]
+
+        # Recursion step over (prev, rank) x cur
+        for t in range(1, T):
+            scores = (delta[:, :, None] + self.log_trans[:, None, :]).reshape(N * k, N)
+            scores += self.log_emit[obs[t]]
+            order = np.argsort(-scores, axis=0, kind='stable')[:k]
+            backpointer[t, :len(order)] = order
+            delta = np.full((N, k), -np.inf)
+            delta[:, :len(order)] = np.take_along_axis(scores, order, axis=0).T
+
+        # Termination step
+        final = (delta + self.log_end[:, None]).reshape(N * k)
+        best = np.argsort(-final, kind='stable')[:k]
+
+        results = []
+        for flat in best:
+            log_prob = final[flat]
+            if log_prob == -np.inf:
+                break
+            state, rank = divmod(int(flat), k)
+            path = []
+            for t in range(T - 1, -1, -1):
+                path.append(self.states[state])
+                state, rank = divmod(int(backpointer[t, rank, state]), k)
+            results.append((''.join(reversed(path)), float(log_prob)))
+        return results
+
+    @staticmethod
+    def _prune(viterbi, beam_width, threshold):
+        """Return the sorted indices of the states that stay in the beam."""
+        active = np.arange(len(viterbi))
+        if threshold is not None:
+            active = active[viterbi >= viterbi.max() - threshold]
+        if beam_width is not None and beam_width < len(active):
+            top = np.argpartition(viterbi[active], -beam_width)[-beam_width:]
+            active = np.sort(active[top])
+        return active
+
+    def score_alignment(self, aligned_pairs):
+        """Joint log-probability of a hidden word and a typed string under an alignment.
+
+        aligned_pairs is an aligner output of (correct_char, typed_char) with
+        None marking gaps. Each gap costs one unseen emission. Returns -inf
+        when the hidden word uses a character the model has no state for.
+        """
+        hidden = [c for c, _ in aligned_pairs if c]
+        if not hidden:
+            return float('-inf')
+        try:
+            path = [self.state_index[c] for c in hidden]
+        except KeyError:
+            return float('-inf')
+
+        log_prob = self.log_start[path[0]] + self.log_end[path[-1]]
+        log_prob += self.log_trans[path[:-1], path[1:]].sum()
+
+        log_unseen = math.log(self.unseen_emission)
+        for correct_char, typed_char in aligned_pairs:
+            if correct_char and typed_char:
+                obs = self.obs_index.get(typed_char, self.unknown_obs)
+                log_prob += self.log_emit[obs, self.state_index[correct_char]]
+            else:
+                log_prob += log_unseen
+        return float(log_prob)
+
+    def decode_many(self, sequences, batch_size=1024):
+        """Viterbi decode many strings, batching words of equal length."""
+        results = [None] * len(sequences)
+        for i, sequence in enumerate(sequences):
+            if not sequence or not self.states:
+                results[i] = sequence
+
+        for chunk, obs in self._batches(sequences, batch_size):
+            paths = self._decode_batch(obs)
+            for i, path in zip(chunk, paths):
+                results[i] = ''.join(self.states[k] for k in path)
+
+        return results
+
+    def _batches(self, sequences, batch_size):
+        """Yield (indices, (B, T) observation array) for non-empty sequences of equal length."""
+        if not self.states:
+            return
+
+        # Group by length so each batch is a dense (B, T) observation array
+        by_length = defaultdict(list)
+        for i, sequence in enumerate(sequences):
+            if sequence:
+                by_length[len(sequence)].append(i)
+
+        for indices in by_length.values():
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                yield chunk, np.array([self.encode(sequences[i]) for i in chunk])
+
+    def _decode_batch(self, obs):
+        """Return best state index paths for a (B, T) observation array."""
+        B, T = obs.shape
+        batch = np.arange(B)
+        backpointer = np.zeros((B, T, len(self.states)), dtype=np.intp)
+
+        # Initialization step
+        viterbi = self.log_start + self.log_emit[obs[:, 0]]
+
+        # Recursion step: scores[b, prev, cur]
+        for t in range(1, T):
+            scores = viterbi[:, :, None] + self.log_trans
+            scores += self.log_emit[obs[:, t]][:, None, :]
+            best_prev = scores.argmax(axis=1)
+            backpointer[:, t] = best_prev
+            viterbi = np.take_along_axis(scores, best_prev[:, None, :], axis=1)[:, 0]
+
+        # Termination step
+        current_state = (viterbi + self.log_end).argmax(axis=1)
+
+        # Backtrack all paths at once
+        paths = np.empty((B, T), dtype=np.intp)
+        for t in range(T - 1, -1, -1):
+            paths[:, t] = current_state
+            current_state = backpointer[batch, t, current_state]
+
+        return paths
+
+    def forward_logprob_many(self, sequences, batch_size=1024):
+        """Return log P(sequence) summed over all hidden paths, for each sequence."""
+        results = [float('-inf')] * len(sequences)
+        for chunk, obs in self._batches(sequences, batch_size):
+            _, log_z = self._forward_batch(obs)
+            for i, value in zip(chunk, log_z.tolist()):
+                results[i] = value
+        return results
+
+    def posteriors_many(self, sequences, batch_size=1024):
+        """Return a (T, N) array of P(state at t | sequence) for each sequence."""
+        results = [np.zeros((len(s), len(self.states))) for s in sequences]
+        for chunk, obs in self._batches(sequences, batch_size):
+            alpha, log_z = self._forward_batch(obs)
+            beta = self._backward_batch(obs)
+            posterior = np.exp(alpha + beta - log_z[:, None, None])
+            for i, row in zip(chunk, posterior):
+                results[i] = row
+        return results
+
+    def score_paths_many(self, pairs, batch_size=1024):
+        """Return log P(hidden, observed) for equal-length (observed, hidden) pairs.
+
+        Hidden strings with a character that has no state score -inf.
+        """
+        results = [float('-inf')] * len(pairs)
+        valid = [i for i, (observed, hidden) in enumerate(pairs)
+                 if hidden and len(observed) == len(hidden)
+                 and all(c in self.state_index for c in hidden)]
+        observed = [pairs[i][0] for i in valid]
+
+        for chunk, obs in self._batches(observed, batch_size):
+            hidden = np.array([[self.state_index[c] for c in pairs[valid[i]][1]] for i in chunk])
+            scores = self._score_batch(obs, hidden)
+            for i, value in zip(chunk, scores.tolist()):
+                results[valid[i]] = value
+        return results
+
+    def _forward_batch(self, obs):
+        """Log-space forward pass: alpha of shape (B, T, N) and log P(obs) of shape (B,)."""
+        B, T = obs.shape
+        alpha = np.empty((B, T, len(self.states)))
+        alpha[:, 0] = self.log_start + self.log_emit[obs[:, 0]]
+        for t in range(1, T):
+            alpha[:, t] = _logsumexp(alpha[:, t - 1, :, None] + self.log_trans, axis=1)
+            alpha[:, t] += self.log_emit[obs[:, t]]
+        return alpha, _logsumexp(alpha[:, -1] + self.log_end, axis=1)
+
+    def _backward_batch(self, obs):
+        """Log-space backward pass: beta of shape (B, T, N), ending in log_end."""
+        B, T = obs.shape
+        beta = np.empty((B, T, len(self.states)))
+        beta[:, -1] = self.log_end
+        for t in range(T - 2, -1, -1):
+            following = self.log_emit[obs[:, t + 1]] + beta[:, t + 1]
+            beta[:, t] = _logsumexp(self.log_trans + following[:, None, :], axis=2)
+        return beta
+
+    def _score_batch(self, obs, hidden):
+        """Joint log-probability of (B, T) hidden state paths and observations."""
+        scores = self.log_start[hidden[:, 0]] + self.log_end[hidden[:, -1]]
+        scores += self.log_trans[hidden[:, :-1], hidden[:, 1:]].sum(axis=1)
+        scores += self.log_emit[obs, hidden].sum(axis=1)
+        return scores
+
+
+def _logsumexp(x, axis):
+    """Numerically stable log(sum(exp(x))) along one axis."""
+    peak = x.max(axis=axis, keepdims=True)
+    return (peak + np.log(np.exp(x - peak).sum(axis=axis, keepdims=True))).squeeze(axis)
@@ -3,7 +3,8 @@ from hidden_markov import SpellingFixerHMM
 def interactive_test():
     """Interactive testing of the spelling fixer."""
     print("Loading HMM spelling fixer...")
-    fixer = SpellingFixerHMM('aspell.txt')
+    # Reuses the compiled model unless aspell.txt changed since it was saved
+    fixer = SpellingFixerHMM.load('aspell.hmm', 'aspell.txt')
     
     print("\n" + "="*60)
     print("INTERACTIVE SPELLING FIXER TEST")
@@ -0,0 +1,145 @@
+import numpy as np
+
+
+class LexiconTrie:
+    """Trie of valid words used to restrict Viterbi to real spellings.
+
+    Every trie node has exactly one parent, so the best path into a node is
+    simply its parent's score plus one transition and one emission. For an
+    observation of length T only nodes that lead to a word of length T are
+    visited, which is usually far fewer than the full N x N state grid.
+    """
+
+    def __init__(self, words=()):
+        self.children = [{}]
+        self.chars = ['']
+        self.parents = [-1]
+        self.terminal = [False]
+        # Lengths of the words passing through each node
+        self.lengths = [set()]
+        self.size = 0
+        # (engine, {T: levels}) replaced whole, so a decode never mixes engines
+        self._compiled = (None, {})
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        """Insert a word; compiled levels are rebuilt on the next decode."""
+        if not word:
+            return
+        node = 0
+        self.lengths[0].add(len(word))
+        for char in word:
+            child = self.children[node].get(char)
+            if child is None:
+                child = len(self.chars)
+                self.children[node][char] = child
+                self.children.append({})
+                self.chars.append(char)
+                self.parents.append(node)
+                self.terminal.append(False)
+                self.lengths.append(set())
+            node = child
+            self.lengths[node].add(len(word))
+        if not self.terminal[node]:
+            self.terminal[node] = True
+            self.size += 1
+        self._compiled = (None, {})
+
+    def __contains__(self, word):
+        node = 0
+        for char in word:
+            node = self.children[node].get(char)
+            if node is None:
+                return False
+        return self.terminal[node]
+
+    def word_at(self, node):
+        """Spell out the word that ends at a node."""
+        chars = []
+        while node > 0:
+            chars.append(self.chars[node])
+            node = self.parents[node]
+        return ''.join(reversed(chars))
+
+    def _levels_for(self, engine, T):
+        """Return per-depth (nodes, states, parent positions) for words of length T."""
+        compiled_engine, cache = self._compiled
+        if compiled_engine is not engine:
+            # State indices depend on the engine, so a new engine needs new levels
+            cache = {}
+            self._compiled = (engine, cache)
+        if T in cache:
+            return cache[T]
+
+        levels = []
+        previous = [0]
+        for _ in range(T):
+            nodes, states, parent_pos = [], [], []
+            for position, node in enumerate(previous):
+                for char, child in self.children[node].items():
+                    state = engine.state_index.get(char)
+                    if state is not None and T in self.lengths[child]:
+                        nodes.append(child)
+                        states.append(state)
+                        parent_pos.append(position)
+            if not nodes:
+                levels = None
+                break
+            levels.append((nodes, np.array(states, dtype=np.intp), np.array(parent_pos, dtype=np.intp)))
+            previous = nodes
+
+        cache[T] = levels
+        return levels
+
+    def _final_scores(self, engine, observation_sequence):
+        """Viterbi scores of every same-length word and their end nodes, or None."""
+        T = len(observation_sequence)
+        levels = self._levels_for(engine, T) if T else None
+        if not levels:
+            return None
+
+        obs = engine.encode(observation_sequence)
+
+        # Initialization step
+        _, states, _ = levels[0]
+        scores = engine.log_start[states] + engine.log_emit[obs[0], states]
+
+        # Each node extends exactly one parent prefix
+        for t in range(1, T):
+            prev_states = states
+            _, states, parent_pos = levels[t]
+            scores = (scores[parent_pos] + engine.log_trans[prev_states[parent_pos], states]
+                      + engine.log_emit[obs[t], states])
+
+        # Termination step
+        return scores + engine.log_end[states], levels[-1][0]
+
+    def decode(self, engine, observation_sequence):
+        """Return the lexicon word of the same length with the best Viterbi score.
+
+        Returns None when the lexicon has no word of that length, and an
+        empty list for k <= 0.
+        """
+        found = self._final_scores(engine, observation_sequence)
+        if found is None:
+            return None
+        if k <= 0:
+            return []
+        final, nodes = found
+        return self.word_at(nodes[int(final.argmax())])
+
+    def decode_nbest(self, engine, observation_sequence, k):
+        """Return the k best same-length lexicon words as (word, log-probability), best first.
+
+        Returns None when the lexicon has no word of that length, and an
+        empty list for k <= 0.
+        """
+        found = self._final_scores(engine, observation_sequence)
+        if found is None:
+            return None
+        if k <= 0:
+            return []
+        final, nodes = found
+        best = np.argsort(-final, kind='stable')[:k]
+        return [(self.word_at(nodes[i]), float(final[i])) for i in best if final[i] > -np.inf]
@@ -0,0 +1,36 @@
+import time
+
+from hidden_markov import SpellingFixerHMM
+from simple_test import ADDITIONAL_TESTS, TEST_CASES
+
+def lexicon_test():
+    """Compare unconstrained and lexicon-constrained decoding."""
+    print("Loading HMM spelling fixer...")
+    fixer = SpellingFixerHMM('aspell.txt')
+
+    # The README examples plus the simple_test words, decoded by the HMM only
+    words = ["fox", "zibra", "acommadate"] + [w for w, _ in TEST_CASES if len(w.split()) == 1] + ADDITIONAL_TESTS
+
+    start = time.perf_counter()
+    plain = [fixer.viterbi_decode(w) for w in words]
+    plain_time = (time.perf_counter() - start) / len(words) * 1e6
+
+    fixer.set_lexicon()
+    # Warm the per-length trie levels so the timing shows steady-state decoding
+    for w in words:
+        fixer.viterbi_decode(w)
+    start = time.perf_counter()
+    constrained = [fixer.viterbi_decode(w) for w in words]
+    lexicon_time = (time.perf_counter() - start) / len(words) * 1e6
+
+    print("\n" + "="*60)
+    print(f"LEXICON-CONSTRAINED DECODING ({fixer.lexicon.size} words)")
+    print("="*60)
+    print(f"{'input':>12} {'viterbi':>12} {'lexicon':>12}")
+    for word, p, c in zip(words, plain, constrained):
+        print(f"{word:>12} {p:>12} {c:>12}")
+
+    print(f"\nMicroseconds per word: viterbi {plain_time:.1f}, lexicon {lexicon_time:.1f}")
+
+if __name__ == "__main__":
+    lexicon_test()
@@ -0,0 +1,103 @@
+import bisect
+import threading
+
+# Upper bounds, in seconds, of the decode latency histogram buckets
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 1e-2, float('inf'))
+# Longer words share one histogram, so label cardinality stays bounded
+MAX_LENGTH = 20
+
+
+class Metrics:
+    """Thread-safe runtime counters and per-word-length decode latency histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        # length -> [bucket counts, sum of seconds, count]
+        self.histograms = {}
+
+    def inc(self, name, value=1):
+        """Add value to a named counter."""
+        if value:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_decode(self, length, seconds, count=1):
+        """Record count decodes of words of one length taking seconds each."""
+        length = min(length, MAX_LENGTH)
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            histogram = self.histograms.get(length)
+            if histogram is None:
+                histogram = self.histograms[length] = [[0] * len(LATENCY_BUCKETS), 0.0, 0]
+            histogram[0][bucket] += count
+            histogram[1] += seconds * count
+            histogram[2] += count
+
+    def snapshot(self):
+        """Return a copy of the counters and histograms."""
+        with self._lock:
+            histograms = {}
+            for length, (buckets, total, count) in sorted(self.histograms.items()):
+                label = f"{length}+" if length == MAX_LENGTH else str(length)
+                histograms[label] = {
+                    'buckets': dict(zip(LATENCY_BUCKETS, buckets)),
+                    'sum_seconds': total,
+                    'count': count,
+                    'mean_us': 1e6 * total / count if count else 0.0,
+                }
+            return {'counters': dict(self.counters), 'decode_latency': histograms}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+def _label(value):
+    return '+Inf' if value == float('inf') else repr(value)
+
+
+def to_prometheus(snapshot, prefix='spelling_hmm'):
+    """Render a SpellingFixerHMM.metrics() snapshot in the Prometheus text format."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for suffix, labels, value in samples:
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{prefix}_{name}{suffix}{{{label_text}}} {value}" if label_text
+                         else f"{prefix}_{name}{suffix} {value}")
+
+    counters = snapshot.get('counters', {})
+    metric('words_total', 'counter', "Word occurrences, by how their correction was found.",
+           [('', {'path': path}, counters.get(f'{path}_words', 0))
+            for path in ('lookup', 'cache', 'candidate', 'viterbi')])
+    metric('distinct_words_total', 'counter', "Distinct words per batch, by how their correction was found.",
+           [('', {'path': path}, counters.get(f'{path}_distinct_words', 0))
+            for path in ('lookup', 'cache', 'candidate', 'viterbi')])
+    metric('low_confidence_total', 'counter', "Word occurrences whose Viterbi correction min_confidence dropped.",
+           [('', {}, counters.get('low_confidence_words', 0))])
+
+    samples = []
+    for length, histogram in snapshot.get('decode_latency', {}).items():
+        cumulative = 0
+        for bound, count in histogram['buckets'].items():
+            cumulative += count
+            samples.append(('_bucket', {'length': length, 'le': _label(bound)}, cumulative))
+        samples.append(('_sum', {'length': length}, histogram['sum_seconds']))
+        samples.append(('_count', {'length': length}, histogram['count']))
+    metric('decode_seconds', 'histogram', "Viterbi decode latency per word, by word length.", samples)
+
+    cache = snapshot.get('cache', {})
+    metric('cache_hit_ratio', 'gauge', "Hit rate of the decoded-word cache.",
+           [('', {}, cache.get('hit_rate', 0.0))])
+    metric('cache_entries', 'gauge', "Entries in the decoded-word cache.",
+           [('', {}, cache.get('size', 0))])
+
+    metric('training_stage_seconds', 'gauge', "Time spent in each training stage.",
+           [('', {'stage': stage}, seconds)
+            for stage, seconds in snapshot.get('training_seconds', {}).items()])
+
+    return '\n'.join(lines) + '\n'
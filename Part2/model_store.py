@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+# File layout: MAGIC, little-endian uint64 header length, JSON header,
+# then each array as raw little-endian bytes aligned to ALIGNMENT.
+MAGIC = b'HMMSPELL'
+FORMAT_VERSION = 5
+ALIGNMENT = 64
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_artifact(path, metadata, arrays):
+    """Write metadata and named arrays to a single memory-mappable file."""
+    arrays = {name: np.ascontiguousarray(a, dtype=a.dtype.newbyteorder('<'))
+              for name, a in arrays.items()}
+
+    # Offsets are relative to the end of the header, so lay them out first
+    layout = {}
+    offset = 0
+    for name, a in arrays.items():
+        offset = _align(offset)
+        layout[name] = {'offset': offset, 'shape': list(a.shape), 'dtype': a.dtype.str}
+        offset += a.nbytes
+
+    header = dict(metadata, format_version=FORMAT_VERSION, arrays=layout)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    # Write to a temporary name so concurrent readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for name, a in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(a.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Read the JSON header of an artifact, or None if it is not one."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    header['data_start'] = _align(len(MAGIC) + 8 + header_len)
+    return header
+
+
+def read_artifact(path):
+    """Return (header, arrays) with arrays as read-only views of one mmap."""
+    header = read_header(path)
+    if header is None:
+        raise ValueError(f"{path} is not a compiled spelling model")
+    if header['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {header['format_version']}, "
+                         f"expected {FORMAT_VERSION}")
+
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        offset = header['data_start'] + spec['offset']
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                     offset=offset).reshape(spec['shape'])
+    return header, arrays
+
+
+def is_current(path, source_path):
+    """Check that an artifact exists and was compiled from source_path as it is now."""
+    if not os.path.exists(path):
+        return False
+    try:
+        header = read_header(path)
+    except (OSError, ValueError, struct.error):
+        return False
+    return (header is not None
+            and header.get('format_version') == FORMAT_VERSION
+            and header.get('source_sha256') == file_sha256(source_path))
@@ -0,0 +1,132 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class HMMTables:
+    """Integer-indexed probability tables of the character HMM.
+
+    States and observations are kept in sorted order, so the same training
+    data gives the same indices, and the same decodes, in every process.
+    Probabilities live in contiguous float64 arrays: start and end of shape
+    (N,), transition of shape (N, N) and emission of shape (N, M).
+    """
+
+    __slots__ = ('states', 'observations', 'state_index', 'obs_index',
+                 'start', 'end', 'transition', 'emission')
+
+    def __init__(self, states, observations, start, end, transition, emission):
+        self.states = tuple(states)
+        self.observations = tuple(observations)
+        self.state_index = {s: i for i, s in enumerate(self.states)}
+        self.obs_index = {o: i for i, o in enumerate(self.observations)}
+        self.start = start
+        self.end = end
+        self.transition = transition
+        self.emission = emission
+
+    @classmethod
+    def from_counts(cls, counts, smoothing):
+        """Build smoothed tables for every state from HMMCounts."""
+        states = sorted(counts.states)
+        observations = sorted(counts.observations)
+        N, M = len(states), len(observations)
+        tables = cls(states, observations, np.empty(N), np.empty(N),
+                     np.empty((N, N)), np.empty((N, M)))
+        for state in states:
+            tables.fill_emission_row(counts, state, smoothing)
+            tables.fill_transition_row(counts, state, smoothing)
+        tables.fill_start_end(counts, smoothing)
+        return tables
+
+    def copy(self):
+        """Return tables with their own copies of the arrays."""
+        return HMMTables(self.states, self.observations, self.start.copy(), self.end.copy(),
+                         self.transition.copy(), self.emission.copy())
+
+    # Each fill computes (count + smoothing) / (total + smoothing * size) with
+    # the same float operations, in the same order, as the original dict loops
+
+    def fill_emission_row(self, counts, state, smoothing):
+        """Calculate emission probabilities with smoothing for one state."""
+        row = counts.emission_counts.get(state, {})
+        total_count = counts.state_counts[state]
+        observed = np.array([row.get(o, 0) for o in self.observations], dtype=float)
+        self.emission[self.state_index[state]] = (
+            (observed + smoothing) / (total_count + smoothing * len(self.observations)))
+
+    def fill_transition_row(self, counts, state, smoothing):
+        """Calculate transition probabilities out of one state."""
+        row = counts.transition_counts.get(state, {})
+        total_transitions = sum(row.values())
+        i = self.state_index[state]
+        if total_transitions > 0:
+            observed = np.array([row.get(s, 0) for s in self.states], dtype=float)
+            self.transition[i] = (observed + smoothing) / (total_transitions + smoothing * len(self.states))
+        else:
+            self.transition[i] = 1.0 / len(self.states)
+
+    def fill_start_end(self, counts, smoothing):
+        """Calculate start and end probabilities."""
+        denominator = counts.total_words + smoothing * len(self.states)
+        start = np.array([counts.start_counts[s] for s in self.states], dtype=float)
+        end = np.array([counts.end_counts[s] for s in self.states], dtype=float)
+        self.start[:] = (start + smoothing) / denominator
+        self.end[:] = (end + smoothing) / denominator
+
+
+class ProbabilityVector(Mapping):
+    """Read-only dict view of a 1-D probability array keyed by symbol.
+
+    Like the defaultdicts it replaces, a missing key reads as 0.0, while
+    get() still returns the caller's default.
+    """
+
+    __slots__ = ('_index', '_values')
+
+    def __init__(self, index, values):
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key):
+        i = self._index.get(key)
+        return 0.0 if i is None else float(self._values[i])
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        return default if i is None else float(self._values[i])
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+class ProbabilityTable(Mapping):
+    """Read-only dict-of-dicts view of a 2-D probability array."""
+
+    __slots__ = ('_rows', '_columns', '_values')
+
+    def __init__(self, rows, columns, values):
+        self._rows = rows
+        self._columns = columns
+        self._values = values
+
+    def __getitem__(self, key):
+        i = self._rows.get(key)
+        if i is None:
+            return ProbabilityVector({}, ())
+        return ProbabilityVector(self._columns, self._values[i])
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
@@ -0,0 +1,125 @@
+import math
+
+import numpy as np
+
+from aligner import edit_distance
+from lexicon import LexiconTrie
+
+
+class PairHMM:
+    """Noisy-channel decoder with insertion and deletion moves over known words.
+
+    A hidden letter may emit nothing (a letter the user left out), and a
+    typed character may be emitted with no hidden letter (a letter the
+    user added). All gap probabilities come from the training counts:
+    each state's deletion rate from its aligned deletions, and the
+    insertion rate and inserted-character distribution from the aligned
+    insertions, with every hidden position paying the chance of no
+    insertion after it.
+
+    Hypotheses are the known correct words, each weighted by its training
+    frequency, stored in a trie and decoded level by level. A character
+    bigram prior cannot make a word longer: "hello" always costs one more
+    transition than "helo". A word prior has no such length bias, so
+    helo -> hello wins on its single deletion. The lattice is indexed by
+    typed position and trie node, restricted to nodes within band letters
+    of the typed position.
+
+    A typed word of n letters is only rewritten to a word within
+    n // letters_per_edit edits, the same gate as the candidate index;
+    decode returns None otherwise, so the caller falls back to Viterbi.
+    """
+
+    def __init__(self, engine, counts, words, smoothing=0.01, band=2, letters_per_edit=4):
+        self.engine = engine
+        self.band = band
+        self.letters_per_edit = letters_per_edit
+        states = engine.states
+
+        # P(state emits nothing) from deletions vs. aligned emissions
+        deleted = np.array([counts.deletion_counts[s] for s in states], dtype=float)
+        emitted = np.array([counts.state_counts[s] for s in states], dtype=float)
+        p_delete = (deleted + smoothing) / (deleted + emitted + 2 * smoothing)
+
+        # P(insert typed char) = insertion rate * P(char | insertion)
+        inserted_total = sum(counts.insertion_counts.values())
+        typed_total = inserted_total + sum(counts.state_counts.values())
+        rate = (inserted_total + smoothing) / (typed_total + 2 * smoothing)
+        vocab = len(engine.observations) + 1
+        self.log_insert = np.array(
+            [math.log(rate * (counts.insertion_counts[o] + smoothing) / (inserted_total + smoothing * vocab))
+             for o in engine.observations]
+            + [math.log(rate * smoothing / (inserted_total + smoothing * vocab))])
+
+        # Every hidden letter is followed by no insertion or by one that was counted
+        self.log_delete = np.log(p_delete) + math.log1p(-rate)
+        self.log_keep = np.log1p(-p_delete) + math.log1p(-rate)
+        self._compile(words)
+
+    def _compile(self, words):
+        """Lay the trie of words out breadth first, one contiguous slice per depth."""
+        trie = LexiconTrie(w for w in words if all(c in self.engine.state_index for c in w))
+        total = sum(words[w] for w in words)
+
+        order = [0]
+        self.level_starts = [0, 1]
+        while self.level_starts[-1] > self.level_starts[-2]:
+            for node in order[self.level_starts[-2]:self.level_starts[-1]]:
+                order.extend(trie.children[node].values())
+            self.level_starts.append(len(order))
+        self.level_starts.pop()
+
+        position = {node: k for k, node in enumerate(order)}
+        self.parent = np.array([position.get(trie.parents[n], 0) for n in order], dtype=np.intp)
+        self.state = np.array([self.engine.state_index.get(trie.chars[n], 0) for n in order], dtype=np.intp)
+        self.depth = np.repeat(np.arange(len(self.level_starts) - 1), np.diff(self.level_starts))
+        self.words = [trie.word_at(n) if trie.terminal[n] else None for n in order]
+        self.log_prior = np.array([math.log(words[w] / total) if w is not None else -np.inf
+                                   for w in self.words])
+
+    def decode(self, observation_sequence):
+        """Return the best known word for the input, which may differ in length, or None."""
+        engine = self.engine
+        T = len(observation_sequence)
+        budget = min(self.band, T // self.letters_per_edit)
+        if not T or not engine.states or len(self.words) == 1:
+            return None
+
+        obs = engine.encode(observation_sequence)
+        b = self.band
+        # Nodes deeper than the longest word allowed can never finish one
+        M = self.level_starts[min(T + b + 1, len(self.level_starts) - 1)]
+        parent = self.parent[:M]
+        state = self.state[:M]
+        depth = self.depth[:M]
+        keep = self.log_keep[state]
+        delete = self.log_delete[state]
+
+        V = np.full(M, -np.inf)
+        V[0] = 0.0
+        for t in range(T + 1):
+            # Deletions add a letter without consuming input: chain them level by level
+            for d in range(1, len(self.level_starts) - 1):
+                start, end = self.level_starts[d], min(self.level_starts[d + 1], M)
+                if start >= end:
+                    break
+                V[start:end] = np.maximum(V[start:end], V[parent[start:end]] + delete[start:end])
+            V[np.abs(depth - t) > b] = -np.inf
+
+            if t == T:
+                break
+
+            # Matches add a letter and consume a typed char; insertions only consume one
+            matched = np.full(M, -np.inf)
+            matched[1:] = V[parent[1:]] + keep[1:] + engine.log_emit[obs[t], state[1:]]
+            V = np.maximum(matched, V + self.log_insert[obs[t]])
+
+        # Termination step: the word prior, best first until one is within the edit budget
+        final = V + self.log_prior[:M]
+        for node in np.argsort(-final, kind='stable'):
+            if final[node] == -np.inf:
+                break
+            word = self.words[node]
+            if edit_distance(observation_sequence, word, budget) <= budget:
+                return word
+        return None
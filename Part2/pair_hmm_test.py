@@ -0,0 +1,60 @@
+import sys
+
+from hidden_markov import SpellingFixerHMM
+from simple_test import ADDITIONAL_TESTS, TEST_CASES
+
+def pair_hmm_test():
+    """Check that pair-HMM decoding fixes length errors without regressing simple_test; exits 1 if not."""
+    print("Loading HMM spelling fixer...")
+    fixer = SpellingFixerHMM.load('aspell.hmm', 'aspell.txt')
+
+    # Every word of the test phrases with its expected correction. The
+    # HMM is called directly as well, since correct_text answers most of
+    # these from the word_corrections lookup
+    tokens = [(w, e) for text, expected in TEST_CASES
+              for w, e in zip(text.split(), expected.split())]
+    words = [w for w, _ in tokens] + ADDITIONAL_TESTS
+
+    plain_texts = [fixer.correct_text(text) for text, _ in TEST_CASES]
+    plain_words = [fixer.viterbi_decode(w) for w in words]
+    fixer.set_pair_hmm()
+    pair_texts = [fixer.correct_text(text) for text, _ in TEST_CASES]
+    pair_words = [fixer.viterbi_decode(w) for w in words]
+
+    print("\n" + "="*60)
+    print("PAIR-HMM DECODING VS PLAIN VITERBI")
+    print("="*60)
+    print(f"{'input':>12} {'expected':>12} {'viterbi':>12} {'pair':>12}")
+    expected_words = [e for _, e in tokens] + [''] * len(ADDITIONAL_TESTS)
+    for word, expected, p, q in zip(words, expected_words, plain_words, pair_words):
+        print(f"{word:>12} {expected:>12} {p:>12} {q:>12}")
+
+    # Words only an inserted or deleted letter can fix; helo must always be among them
+    fixes = [w for (w, expected), p, q in zip(tokens, plain_words, pair_words)
+             if p != expected and q == expected and len(w) != len(expected)]
+    print(f"Length changes fixed by pair mode: {sorted(set(fixes))}")
+    helo = fixer.pair_hmm.decode('helo')
+    print(f"pair_hmm.decode('helo'): {helo}")
+
+    regressions = [(text, p, q) for (text, expected), p, q in zip(TEST_CASES, plain_texts, pair_texts)
+                   if p == expected and q != expected]
+    regressions += [(w, p, q) for (w, expected), p, q in zip(tokens, plain_words, pair_words)
+                    if p == expected and q != expected]
+
+    plain_correct = sum(p == e for (_, e), p in zip(tokens, plain_words))
+    pair_correct = sum(q == e for (_, e), q in zip(tokens, pair_words))
+    print(f"\nHMM word accuracy: viterbi {plain_correct}/{len(tokens)}, pair {pair_correct}/{len(tokens)}")
+
+    failed = False
+    for text, p, q in regressions:
+        print(f"REGRESSION '{text}': viterbi '{p}', pair '{q}'")
+        failed = True
+    if helo != 'hello' or 'helo' not in fixes or len(set(fixes)) < 2:
+        print("FAILED: pair mode must fix helo -> hello and at least one more length error")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("No regressions.")
+
+if __name__ == "__main__":
+    pair_hmm_test()
@@ -0,0 +1,98 @@
+import numpy as np
+
+
+class _TransitionSplit:
+    """Log transitions as a per-row background plus the cells above it; never modified."""
+
+    def __init__(self, log_trans):
+        N = len(log_trans)
+        self.background = log_trans.min(axis=1) if N else np.empty(0)
+        # Observed cells ordered by destination, then source, for segmented reductions
+        dst, src = np.nonzero((log_trans > self.background[:, None]).T)
+        self.src = src
+        self.dst = dst
+        self.log_prob = log_trans[src, dst]
+        self.columns, self.starts = np.unique(dst, return_index=True)
+        self.nnz = len(src)
+
+
+class SparseViterbi:
+    """Viterbi over transitions split into sparse observed cells plus a background.
+
+    With additive smoothing every unseen bigram out of state i has the same
+    probability, the smallest in its row. Each row is therefore stored as
+    that background value plus the cells that rise above it. A step then
+    takes one max over all states for the background and one segmented max
+    over the observed cells, O(nnz + N) instead of O(N^2). An observed cell
+    always beats its own row's background, so the maxima equal the dense
+    ones; only ties that floating-point rounding creates after adding the
+    emission can pick a different, equally scored path.
+    """
+
+    def __init__(self):
+        # (engine, split) swapped in with one assignment, never changed in place
+        self._compiled = None
+
+    def _split_for(self, engine):
+        """Return the split of the engine's log transitions, rebuilt when the engine changes."""
+        compiled = self._compiled
+        if compiled is None or compiled[0] is not engine:
+            compiled = (engine, _TransitionSplit(engine.log_trans))
+            self._compiled = compiled
+        return compiled[1]
+
+    @property
+    def nnz(self):
+        compiled = self._compiled
+        return compiled[1].nnz if compiled is not None else 0
+
+    def decode(self, engine, observation_sequence):
+        """Return the most likely state sequence, like CompiledHMM.decode."""
+        if not observation_sequence:
+            return ""
+
+        N = len(engine.states)
+        if N == 0:
+            return observation_sequence
+        # A decode keeps the split it started with even if update() swaps engines
+        split = self._split_for(engine)
+
+        obs = engine.encode(observation_sequence)
+        T = len(obs)
+        backpointer = np.zeros((T, N), dtype=np.intp)
+        sparse_best = np.full(N, -np.inf)
+        first = np.full(N, N, dtype=np.intp)
+
+        # Initialization step
+        viterbi = engine.log_start + engine.log_emit[obs[0]]
+
+        for t in range(1, T):
+            # Best unseen-bigram predecessor, shared by every destination
+            background = viterbi + split.background
+            best_background = int(background.argmax())
+            background_score = background[best_background]
+
+            if split.nnz:
+                scores = viterbi[split.src] + split.log_prob
+                sparse_best[split.columns] = np.maximum.reduceat(scores, split.starts)
+                best = np.maximum(sparse_best, background_score)
+                # Lowest source reaching the best score, as the dense argmax picks
+                hits = np.where(scores == best[split.dst], split.src, N)
+                first[split.columns] = np.minimum.reduceat(hits, split.starts)
+            else:
+                best = np.full(N, background_score)
+
+            backpointer[t] = np.where(best == background_score,
+                                      np.minimum(first, best_background), first)
+            viterbi = best + engine.log_emit[obs[t]]
+
+        # Termination step
+        current_state = int((viterbi + engine.log_end).argmax())
+
+        best_path = []
+        for t in range(T - 1, -1, -1):
+            best_path.append(engine.states[current_state])
+            current_state = backpointer[t, current_state]
+
+        best_path.reverse()
+        return ''.join(best_path)
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from hidden_markov import SpellingFixerHMM
+
+
+class MicroBatcher:
+    """Coalesce concurrent correction requests into batched correct_batch calls."""
+
+    def __init__(self, fixer, max_batch=64, max_wait=0.005, executor=None):
+        self.fixer = fixer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.queue = asyncio.Queue()
+        self.requests = 0
+        self.batches = 0
+        self.total_latency = 0.0
+        self.recent_latencies = deque(maxlen=10000)
+        self.started = time.perf_counter()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def correct(self, text):
+        """Queue one text and wait for its corrected form."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            # Keep collecting until the batch is full or the wait runs out
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.fixer.correct_batch, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            self.batches += 1
+            for (_, future, queued), result in zip(batch, results):
+                latency = now - queued
+                self.requests += 1
+                self.total_latency += latency
+                self.recent_latencies.append(latency)
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        """Return throughput and latency counters."""
+        latencies = sorted(self.recent_latencies)
+
+        def quantile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+        elapsed = time.perf_counter() - self.started
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'requests_per_second': self.requests / elapsed if elapsed else 0.0,
+            'mean_latency_ms': 1000 * self.total_latency / self.requests if self.requests else 0.0,
+            'p50_latency_ms': 1000 * quantile(0.5),
+            'p99_latency_ms': 1000 * quantile(0.99),
+            'queue_depth': self.queue.qsize(),
+            'cache': self.fixer.cache_stats(),
+            'metrics': self.fixer.metrics() if self.fixer.recorder is not None else None,
+        }
+
+
+async def handle_client(batcher, reader, writer):
+    """Line protocol: each line is corrected; the line STATS returns JSON counters."""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            text = line.decode('utf-8', errors='replace').rstrip('\r\n')
+            if text == 'STATS':
+                response = json.dumps(batcher.stats())
+            else:
+                response = await batcher.correct(text)
+            writer.write(response.encode('utf-8') + b'\n')
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(fixer, host, port, max_batch, max_wait):
+    batcher = MicroBatcher(fixer, max_batch, max_wait)
+    batcher.start()
+    server = await asyncio.start_server(
+        lambda r, w: handle_client(batcher, r, w), host, port)
+    print(f"Serving spelling corrections on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Line-protocol spelling correction server.")
+    parser.add_argument('--aspell', default='aspell.txt', help="training file")
+    parser.add_argument('--model', help="compiled model path, rebuilt if the training file changed")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--metrics', action='store_true',
+                        help="record correction paths and decode latencies, reported by STATS")
+    args = parser.parse_args()
+
+    print("Loading HMM spelling fixer...")
+    if args.model:
+        fixer = SpellingFixerHMM.load(args.model, args.aspell)
+    else:
+        fixer = SpellingFixerHMM(args.aspell)
+    if args.metrics:
+        fixer.enable_metrics()
+
+    try:
+        asyncio.run(serve(fixer, args.host, args.port, args.max_batch, args.max_wait_ms / 1000))
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+import time
+
+from hidden_markov import SpellingFixerHMM
+
+def main():
+    """Stream typo corpora into a compiled model file."""
+    parser = argparse.ArgumentParser(description="Train the HMM spelling fixer from typo files.")
+    parser.add_argument('sources', nargs='+',
+                        help="aspell-format files, .gz files, or '-' for stdin")
+    parser.add_argument('-o', '--output', required=True, help="path of the compiled model")
+    parser.add_argument('--no-corrections', action='store_true',
+                        help="skip the direct word lookup table to keep memory bounded")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    fixer = SpellingFixerHMM.train_streaming(args.sources, keep_corrections=not args.no_corrections)
+    fixer.save(args.output)
+    
+    print(f"Trained on {fixer.num_word_pairs} word pairs in {time.perf_counter() - start:.2f}s")
+    fixer.print_statistics()
+
+if __name__ == "__main__":
+    main()
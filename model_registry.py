@@ -0,0 +1,73 @@
+"""Lazy, process-wide access to the course models.
+
+Importing this module does no work and loads neither pgmpy nor numpy.
+Each getter builds or loads its model on first use and returns the same
+object on every later call in the process, so short-lived workers only
+pay for the models they actually touch.
+"""
+import importlib
+import os
+import sys
+import threading
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_models = {}
+_lock = threading.Lock()
+
+
+def _module(part, name):
+    """Import a module from Part1 or Part2, whose modules use flat imports."""
+    path = os.path.join(_ROOT, part)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(name)
+
+
+def _cached(key, build):
+    model = _models.get(key)
+    if model is None:
+        # One lock for all models keeps two threads from building the same one
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = _models[key] = build()
+    return model
+
+
+def get_alarm_network():
+    """Return the alarm DiscreteBayesianNetwork."""
+    return _cached('alarm', lambda: _module('Part1', 'alarm').get_alarm_network())
+
+
+def get_alarm_inference():
+    """Return the compiled, caching inference engine for the alarm network."""
+    return _cached('alarm_infer', lambda: _module('Part1', 'alarm').get_alarm_infer())
+
+
+def get_car_network():
+    """Return the car diagnosis DiscreteBayesianNetwork."""
+    return _cached('car', lambda: _module('Part1', 'carnet').get_car_network())
+
+
+def get_car_inference():
+    """Return the compiled, caching inference engine for the car network."""
+    return _cached('car_infer', lambda: _module('Part1', 'carnet').get_car_infer())
+
+
+def get_spelling_model(aspell_file=None, model_path=None):
+    """Return a SpellingFixerHMM, loaded from its compiled file when that is current.
+
+    aspell_file defaults to Part2/aspell.txt and model_path to the
+    SPELLING_MODEL_PATH environment variable or aspell_file with a .hmm
+    suffix. The file is rebuilt only when the training data has changed,
+    so later cold starts skip training.
+    """
+    aspell_file = os.path.abspath(aspell_file or os.path.join(_ROOT, 'Part2', 'aspell.txt'))
+    model_path = model_path or os.environ.get('SPELLING_MODEL_PATH') \
+        or os.path.splitext(aspell_file)[0] + '.hmm'
+
+    def build():
+        hidden_markov = _module('Part2', 'hidden_markov')
+        return hidden_markov.SpellingFixerHMM.load(model_path, aspell_file)
+
+    return _cached(('spelling', aspell_file, os.path.abspath(model_path)), build)